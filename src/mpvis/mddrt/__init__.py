@@ -7,4 +7,5 @@ from mpvis.mddrt.actions import (
     save_vis_multi_dimensional_drt,
     view_multi_dimensional_drt,
 )
-from mpvis.mddrt.pruning import prune_tree_to_depth
+from mpvis.mddrt.compact_tree import CompactTree
+from mpvis.mddrt.pruning import prune_tree_to_depth, pruned_tree_view
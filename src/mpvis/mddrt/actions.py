@@ -4,6 +4,7 @@ from typing import Literal
 
 import pandas as pd
 
+from mpvis.mddrt.compact_tree import CompactTree
 from mpvis.mddrt.drt_parameters import DirectlyRootedTreeParameters
 from mpvis.mddrt.tree_builder import DirectlyRootedTreeBuilder
 from mpvis.mddrt.tree_diagrammer import DirectlyRootedTreeDiagrammer
@@ -25,7 +26,10 @@ def discover_multi_dimensional_drt(
     timestamp_key: str = "time:timestamp",
     start_timestamp_key: str = "start_timestamp",
     cost_key: str = "cost:total",
-) -> TreeNode:
+    aggregate_variants: bool = False,
+    n_jobs: int = 1,
+    compact: bool = False,
+) -> TreeNode | CompactTree:
     """
     Discovers and constructs a multi-dimensional Directly Rooted Tree (DRT) from the provided event log.
 
@@ -50,9 +54,17 @@ def discover_multi_dimensional_drt(
         timestamp_key (str, optional): The key for timestamps in the event log. Defaults to "time:timestamp".
         start_timestamp_key (str, optional): The key for start timestamps in the event log. Defaults to "start_timestamp".
         cost_key (str, optional): The key for cost information in the event log. Defaults to "cost:total".
+        aggregate_variants (bool, optional): Whether to group the cases by their sequence of activities and insert
+                                             each variant once with its aggregated dimensions. Defaults to False.
+        n_jobs (int, optional): The number of processes used to build the tree from blocks of cases. -1 uses every
+                                core. Defaults to 1.
+        compact (bool, optional): Whether to build the DRT as a `CompactTree`, which stores the nodes as arrays and
+                                  builds them from blocks of cases, using much less memory for large trees.
+                                  Defaults to False.
 
     Returns:
-        TreeNode: The root node of the constructed multi-dimensional Directly Rooted Tree (DRT).
+        TreeNode | CompactTree: The root node of the constructed multi-dimensional Directly Rooted Tree (DRT), or
+                                the compact tree when `compact` is True.
 
     Example:
         >>> drt = discover_multi_dimensional_drt(log, calculate_time=True, calculate_cost=False)
@@ -75,6 +87,9 @@ def discover_multi_dimensional_drt(
         calculate_cost,
         calculate_quality,
         calculate_flexibility,
+        aggregate_variants,
+        n_jobs,
+        compact,
     )
     multi_dimensional_drt = DirectlyRootedTreeBuilder(log, parameters).get_tree()
     if group_activities:
@@ -83,16 +98,18 @@ def discover_multi_dimensional_drt(
     return multi_dimensional_drt
 
 
-def group_drt_activities(multi_dimensional_drt: TreeNode, show_names: bool = False) -> TreeNode:
+def group_drt_activities(
+    multi_dimensional_drt: TreeNode | CompactTree, show_names: bool = False
+) -> TreeNode | CompactTree:
     """
     Groups activities in a multi-dimensional directed rooted tree (DRT).
 
     Args:
-        multi_dimension_drt (TreeNode): The root of the multi-dimensional DRT.
+        multi_dimension_drt (TreeNode | CompactTree): The root of the multi-dimensional DRT, or the compact tree.
         show_names (bool, optional): Whether to show the names of the grouped activities. Defaults to False.
 
     Returns:
-        TreeNode: The root of the grouped multi-dimensional DRT.
+        TreeNode | CompactTree: The root of the grouped multi-dimensional DRT, or the grouped compact tree.
 
     """
     grouper = DirectedRootedTreeGrouper(multi_dimensional_drt, show_names)
@@ -100,7 +117,7 @@ def group_drt_activities(multi_dimensional_drt: TreeNode, show_names: bool = Fal
 
 
 def get_multi_dimensional_drt_string(
-    multi_dimensional_drt: TreeNode,
+    multi_dimensional_drt: TreeNode | CompactTree,
     visualize_time: bool = True,
     visualize_cost: bool = True,
     visualize_quality: bool = True,
@@ -112,7 +129,7 @@ def get_multi_dimensional_drt_string(
     Generates a string representation of a multi-dimensional directly rooted tree (DRT) diagram.
 
     Args:
-        multi_dimension_drt (TreeNode): The root of the multi-dimensional DRT.
+        multi_dimension_drt (TreeNode | CompactTree): The root of the multi-dimensional DRT, or the compact tree.
         visualize_time (bool, optional): Whether to include the time dimension in the visualization. Defaults to True.
         visualize_cost (bool, optional): Whether to include the cost dimension in the visualization. Defaults to True.
         visualize_quality (bool, optional): Whether to include the quality dimension in the visualization. Defaults to True.
@@ -145,7 +162,7 @@ def get_multi_dimensional_drt_string(
 
 
 def view_multi_dimensional_drt(
-    multi_dimensional_drt: TreeNode,
+    multi_dimensional_drt: TreeNode | CompactTree,
     visualize_time: bool = True,
     visualize_cost: bool = True,
     visualize_quality: bool = True,
@@ -158,7 +175,7 @@ def view_multi_dimensional_drt(
     Visualizes a multi-dimensional directly rooted tree (DRT) using a graphical format.
 
     Args:
-        multi_dimension_drt (TreeNode): The root of the multi-dimensional DRT.
+        multi_dimension_drt (TreeNode | CompactTree): The root of the multi-dimensional DRT, or the compact tree.
         visualize_time (bool, optional): Whether to include the time dimension in the visualization. Defaults to True.
         visualize_cost (bool, optional): Whether to include the cost dimension in the visualization. Defaults to True.
         visualize_quality (bool, optional): Whether to include the quality dimension in the visualization. Defaults to True.
@@ -195,7 +212,7 @@ def view_multi_dimensional_drt(
 
 
 def save_vis_multi_dimensional_drt(
-    multi_dimensional_drt: TreeNode,
+    multi_dimensional_drt: TreeNode | CompactTree,
     file_path: str,
     visualize_time: bool = True,
     visualize_cost: bool = True,
@@ -210,7 +227,7 @@ def save_vis_multi_dimensional_drt(
     Saves a visualization of a multi-dimensional directly rooted tree (DRT) to a file.
 
     Args:
-        multi_dimension_drt (TreeNode): The root of the multi-dimensional DRT to visualize.
+        multi_dimension_drt (TreeNode | CompactTree): The root of the multi-dimensional DRT, or the compact tree, to visualize.
         file_path (str): The path where the visualization will be saved.
         visualize_time (bool, optional): Whether to include the time dimension in the visualization. Defaults to True.
         visualize_cost (bool, optional): Whether to include the cost dimension in the visualization. Defaults to True.
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from mpvis.mddrt.drt_parameters import DirectlyRootedTreeParameters
+
+METRICS_MAPPING = {
+    "cost": "Cost",
+    "time": "Duration",
+    "flexibility": "Optionality",
+    "quality": "Rework",
+}
+
+
+def to_microseconds(durations: np.ndarray) -> np.ndarray:
+    return durations.astype("timedelta64[us]").astype(np.int64)
+
+
+def cumsum_by_case(values: np.ndarray, cases_codes: np.ndarray) -> np.ndarray:
+    return pd.Series(values).groupby(cases_codes, sort=False).cumsum().to_numpy()
+
+
+class CaseSequence:
+    """
+    Events of one case, or of every case of a variant, of a `CaseSequences` as Python lists,
+    with the running totals of every dimension up to each event. For a variant the values of
+    each position are summed over its `frequency` cases, and `min_values` and `max_values` hold
+    the extremes of the service times and costs.
+    """
+
+    __slots__ = (
+        "accumulated",
+        "activities",
+        "costs",
+        "frequency",
+        "is_optional",
+        "is_rework",
+        "max_values",
+        "metrics",
+        "min_values",
+        "service_times",
+        "waiting_times",
+    )
+
+    def __init__(
+        self,
+        activities: list[str],
+        frequency: int,
+        service_times: list[int] | None,
+        waiting_times: list[int] | None,
+        costs: list | None,
+        accumulated: dict[str, list],
+        min_values: dict[str, list],
+        max_values: dict[str, list],
+        is_rework: list[bool] | None,
+        is_optional: list[bool] | None,
+        metrics: dict,
+    ) -> None:
+        self.activities: list[str] = activities
+        self.frequency: int = frequency
+        self.service_times: list[int] | None = service_times
+        self.waiting_times: list[int] | None = waiting_times
+        self.costs: list | None = costs
+        self.accumulated: dict[str, list] = accumulated
+        self.min_values: dict[str, list] = min_values
+        self.max_values: dict[str, list] = max_values
+        self.is_rework: list[bool] | None = is_rework
+        self.is_optional: list[bool] | None = is_optional
+        self.metrics: dict = metrics
+
+    def __len__(self) -> int:
+        return len(self.activities)
+
+
+class CaseSequences:
+    """
+    Events of every case of a log, ordered by start timestamp inside each case and stored as
+    contiguous arrays. The events of the i-th case are at positions offsets[i]:offsets[i + 1].
+    Service and waiting times and the case duration are stored in microseconds.
+
+    The running totals of each dimension inside every case are computed once for the whole log:
+    the lead time and cost up to each event, the number of reworked activities, which are the
+    repetitions of an activity already seen in the case, and the number of distinct optional
+    activities seen so far.
+    """
+
+    def __init__(
+        self,
+        log: pd.DataFrame,
+        params: DirectlyRootedTreeParameters,
+        cases_metrics: pd.DataFrame,
+        optional_activities: frozenset[str] = frozenset(),
+    ) -> None:
+        case_codes, self.case_ids = pd.factorize(log[params.case_id_key])
+        start_order = (
+            log[params.start_timestamp_key]
+            .reset_index(drop=True)
+            .sort_values(kind="stable")
+            .index.to_numpy()
+        )
+        start_order = start_order[case_codes[start_order] >= 0]
+        events_order = start_order[np.argsort(case_codes[start_order], kind="stable")]
+        events = log.iloc[events_order]
+
+        cases_sizes = np.bincount(case_codes[events_order], minlength=len(self.case_ids))
+        self.offsets: np.ndarray = np.concatenate(([0], np.cumsum(cases_sizes)))
+
+        self.activity_codes, activity_names = pd.factorize(
+            events[params.activity_key], use_na_sentinel=False
+        )
+        self.activity_names: list[str] = activity_names.tolist()
+        events_cases_codes = np.repeat(np.arange(len(self.case_ids)), cases_sizes)
+        self.accumulated: dict[str, np.ndarray] = {}
+
+        self.service_times: np.ndarray | None = None
+        self.waiting_times: np.ndarray | None = None
+        if params.calculate_time:
+            self.service_times = to_microseconds(
+                (events[params.timestamp_key] - events[params.start_timestamp_key]).to_numpy()
+            )
+            start_timestamps = events[params.start_timestamp_key].array
+            end_timestamps = events[params.timestamp_key].array
+            self.waiting_times = np.zeros(len(events), dtype=np.int64)
+            self.waiting_times[1:] = to_microseconds(
+                (start_timestamps[1:] - end_timestamps[:-1]).to_numpy()
+            )
+            self.waiting_times[self.offsets[:-1]] = 0
+            self.accumulated["time"] = cumsum_by_case(
+                self.service_times + self.waiting_times, events_cases_codes
+            )
+
+        self.costs: np.ndarray | None = None
+        if params.calculate_cost:
+            self.costs = events[params.cost_key].to_numpy()
+            self.accumulated["cost"] = cumsum_by_case(self.costs, events_cases_codes)
+
+        self.is_rework: np.ndarray | None = None
+        self.is_optional: np.ndarray | None = None
+        if params.calculate_quality or params.calculate_flexibility:
+            events_keys = events_cases_codes * len(self.activity_names) + self.activity_codes
+            self.is_rework = pd.Series(events_keys).duplicated().to_numpy()
+        if params.calculate_quality:
+            self.accumulated["quality"] = cumsum_by_case(
+                self.is_rework.astype(np.int64), events_cases_codes
+            )
+        if params.calculate_flexibility:
+            optional_codes = np.isin(activity_names, list(optional_activities))
+            self.is_optional = optional_codes[self.activity_codes]
+            self.accumulated["flexibility"] = cumsum_by_case(
+                (self.is_optional & ~self.is_rework).astype(np.int64), events_cases_codes
+            )
+
+        cases_metrics = cases_metrics.reindex(self.case_ids)
+        self.metrics: dict[str, list] = {}
+        for dimension, metric in METRICS_MAPPING.items():
+            if metric not in cases_metrics:
+                continue
+            values = cases_metrics[metric].to_numpy()
+            self.metrics[dimension] = (
+                to_microseconds(values) if dimension == "time" else values
+            ).tolist()
+
+    def __len__(self) -> int:
+        return len(self.case_ids)
+
+    def __getitem__(self, index: int) -> CaseSequence:
+        start, end = self.offsets[index], self.offsets[index + 1]
+
+        def events_slice(values: np.ndarray | None) -> list | None:
+            return values[start:end].tolist() if values is not None else None
+
+        service_times = events_slice(self.service_times)
+        costs = events_slice(self.costs)
+        extremes = {
+            dimension: values
+            for dimension, values in [("time", service_times), ("cost", costs)]
+            if values is not None
+        }
+        return CaseSequence(
+            [self.activity_names[code] for code in self.activity_codes[start:end]],
+            1,
+            service_times,
+            events_slice(self.waiting_times),
+            costs,
+            {dimension: events_slice(values) for dimension, values in self.accumulated.items()},
+            extremes,
+            extremes,
+            events_slice(self.is_rework),
+            events_slice(self.is_optional),
+            {dimension: values[index] for dimension, values in self.metrics.items()},
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class VariantSequences:
+    """
+    Cases of a `CaseSequences` grouped by their sequence of activities. Every variant is a
+    single `CaseSequence` whose values are aggregated over its cases, so a tree built from the
+    variants only depends on their number. Variants keep the order of their first case, which
+    keeps the order in which tree nodes are created.
+    """
+
+    def __init__(self, cases: CaseSequences) -> None:
+        self.cases: CaseSequences = cases
+        offsets = cases.offsets
+        cases_sizes = np.diff(offsets)
+        cases_keys = [
+            cases.activity_codes[start:end].tobytes()
+            for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+        ]
+        cases_variants, _ = pd.factorize(pd.Series(cases_keys, dtype=object))
+        self.frequencies: list[int] = np.bincount(cases_variants).tolist()
+        self.first_cases: np.ndarray = np.unique(cases_variants, return_index=True)[1]
+        self.offsets: np.ndarray = np.concatenate(([0], np.cumsum(cases_sizes[self.first_cases])))
+
+        events_variants = np.repeat(cases_variants, cases_sizes)
+        events_positions = np.arange(offsets[-1]) - np.repeat(offsets[:-1], cases_sizes)
+        events_values = {
+            name: values
+            for name, values in [
+                ("service_times", cases.service_times),
+                ("waiting_times", cases.waiting_times),
+                ("costs", cases.costs),
+                *[(f"accumulated_{name}", values) for name, values in cases.accumulated.items()],
+            ]
+            if values is not None
+        }
+        grouped_events = pd.DataFrame(events_values).groupby(
+            [events_variants, events_positions], sort=True
+        )
+        self.sums: dict[str, np.ndarray] = {
+            name: values.to_numpy() for name, values in grouped_events.sum().items()
+        }
+        extremes_columns = {"time": "service_times", "cost": "costs"}
+        extremes_columns = {
+            dimension: column
+            for dimension, column in extremes_columns.items()
+            if column in events_values
+        }
+        self.min_values: dict[str, np.ndarray] = {
+            dimension: grouped_events[column].min().to_numpy()
+            for dimension, column in extremes_columns.items()
+        }
+        self.max_values: dict[str, np.ndarray] = {
+            dimension: grouped_events[column].max().to_numpy()
+            for dimension, column in extremes_columns.items()
+        }
+        self.metrics: dict[str, list] = {
+            dimension: pd.Series(values).groupby(cases_variants, sort=True).sum().tolist()
+            for dimension, values in cases.metrics.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.first_cases)
+
+    def __getitem__(self, index: int) -> CaseSequence:
+        first_case = self.cases[int(self.first_cases[index])]
+        start, end = self.offsets[index], self.offsets[index + 1]
+
+        def variant_slice(values: np.ndarray | None) -> list | None:
+            return values[start:end].tolist() if values is not None else None
+
+        return CaseSequence(
+            first_case.activities,
+            self.frequencies[index],
+            variant_slice(self.sums.get("service_times")),
+            variant_slice(self.sums.get("waiting_times")),
+            variant_slice(self.sums.get("costs")),
+            {
+                dimension: variant_slice(self.sums[f"accumulated_{dimension}"])
+                for dimension in first_case.accumulated
+            },
+            {dimension: variant_slice(values) for dimension, values in self.min_values.items()},
+            {dimension: variant_slice(values) for dimension, values in self.max_values.items()},
+            first_case.is_rework,
+            first_case.is_optional,
+            {dimension: values[index] for dimension, values in self.metrics.items()},
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+from array import array
+from datetime import timedelta
+from sys import maxsize
+
+import numpy as np
+
+from mpvis.mddrt.tree_node import TreeNode
+from mpvis.mddrt.utils.builder import create_dimensions_data
+
+STATUS_KEYS = {"quality": "is_rework", "flexibility": "is_optional"}
+MAX_TIMEDELTA_SECONDS = timedelta.max.total_seconds()
+MAX_NUMBER = float(maxsize)
+
+
+def to_seconds(value: float | timedelta) -> float:
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+
+def to_number(value: float) -> int | float:
+    if value >= MAX_NUMBER:
+        return maxsize
+    return int(value) if value.is_integer() else float(value)
+
+
+def to_timedelta(seconds: float) -> timedelta:
+    if seconds >= MAX_TIMEDELTA_SECONDS:
+        return timedelta.max
+    return timedelta(seconds=seconds)
+
+
+class CompactTree:
+    """
+    Multi-dimensional DRT stored as a struct of arrays. Nodes are numbered in breadth-first
+    order with the root at 0 and `parents` holds the index of the parent of every node (-1 for
+    the root). Children are stored in CSR layout: the children of node i are the entries of
+    `children_indices` between children_offsets[i] and children_offsets[i + 1].
+    Every metric of `create_dimensions_data` is a float64 column, with time metrics in seconds.
+
+    `root` and `node` return `CompactTreeNode` views with the read API of `TreeNode`, so the
+    diagrammer can draw a compact tree and pruning and grouping have array implementations.
+    `CompactTreeBuilder` builds the arrays from blocks of cases without building the whole
+    `TreeNode` tree first.
+    """
+
+    def __init__(
+        self,
+        names: np.ndarray,
+        depths: np.ndarray,
+        is_path_end: np.ndarray,
+        frequencies: np.ndarray,
+        parents: np.ndarray,
+        metrics: dict[str, dict[str, np.ndarray]],
+        statuses: dict[str, np.ndarray],
+    ) -> None:
+        self.names: np.ndarray = names
+        self.depths: np.ndarray = depths
+        self.is_path_end: np.ndarray = is_path_end
+        self.frequencies: np.ndarray = frequencies
+        self.parents: np.ndarray = parents
+        self.metrics: dict[str, dict[str, np.ndarray]] = metrics
+        self.statuses: dict[str, np.ndarray] = statuses
+
+        children_counts = np.bincount(parents[1:], minlength=len(parents))
+        self.children_offsets: np.ndarray = np.concatenate(([0], np.cumsum(children_counts)))
+        self.children_indices: np.ndarray = np.argsort(parents[1:], kind="stable") + 1
+        self.children_index: dict[tuple[int, str, bool], int] | None = None
+
+    @classmethod
+    def from_tree(cls, root: TreeNode) -> CompactTree:
+        nodes = [root]
+        parents = [-1]
+        position = 0
+        while position < len(nodes):
+            for child in nodes[position].children:
+                nodes.append(child)
+                parents.append(position)
+            position += 1
+
+        metrics = {
+            dimension: {
+                metric: np.fromiter(
+                    (to_seconds(node.dimensions_data[dimension][metric]) for node in nodes),
+                    dtype=np.float64,
+                    count=len(nodes),
+                )
+                for metric in default_data
+            }
+            for dimension, default_data in create_dimensions_data().items()
+        }
+        statuses = {
+            dimension: np.array(
+                [node.dimensions_data[dimension].get(status_key) for node in nodes], dtype=object
+            )
+            for dimension, status_key in STATUS_KEYS.items()
+        }
+        return cls(
+            np.array([node.name for node in nodes], dtype=object),
+            np.fromiter((node.depth for node in nodes), dtype=np.int32, count=len(nodes)),
+            np.fromiter((node.is_path_end for node in nodes), dtype=bool, count=len(nodes)),
+            np.fromiter((node.frequency for node in nodes), dtype=np.int64, count=len(nodes)),
+            np.array(parents, dtype=np.int64),
+            metrics,
+            statuses,
+        )
+
+    def to_tree(self) -> TreeNode:
+        nodes = []
+        for index in range(len(self)):
+            node_view = self.node(index)
+            node = TreeNode(
+                name=node_view.name, depth=node_view.depth, is_path_end=node_view.is_path_end
+            )
+            node.frequency = node_view.frequency
+            node.dimensions_data = node_view.dimensions_data
+            nodes.append(node)
+
+        for index, parent in enumerate(self.parents.tolist()):
+            if parent >= 0:
+                nodes[index].set_parent(nodes[parent])
+        for index, node in enumerate(nodes):
+            node.set_children([nodes[child] for child in self.children_of(index).tolist()])
+        return nodes[0]
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    @property
+    def root(self) -> CompactTreeNode:
+        return CompactTreeNode(self, 0)
+
+    def node(self, index: int) -> CompactTreeNode:
+        return CompactTreeNode(self, index)
+
+    def children_of(self, index: int) -> np.ndarray:
+        return self.children_indices[
+            self.children_offsets[index] : self.children_offsets[index + 1]
+        ]
+
+    def child(self, index: int, *, name: str, is_path_end: bool) -> int | None:
+        """
+        Returns the first child of the node with the name and path end status, like the
+        `children_index` of `TreeNode`. The lookup is built from the CSR children on first use.
+        """
+        if self.children_index is None:
+            self.children_index = {}
+            for child in self.children_indices.tolist():
+                self.children_index.setdefault(
+                    (int(self.parents[child]), self.names[child], bool(self.is_path_end[child])),
+                    child,
+                )
+        return self.children_index.get((index, name, is_path_end))
+
+    def metric(self, index: int, dimension: str, metric: str) -> int | float | timedelta | str:
+        if metric == STATUS_KEYS.get(dimension):
+            return self.statuses[dimension][index]
+        value = self.metrics[dimension][metric][index]
+        return to_timedelta(value) if dimension == "time" else to_number(value)
+
+    def dimensions_data(self, index: int) -> dict:
+        dimensions_data = {}
+        for dimension, metrics in self.metrics.items():
+            dimensions_data[dimension] = {
+                metric: self.metric(index, dimension, metric) for metric in metrics
+            }
+            status = self.statuses[dimension][index] if dimension in self.statuses else None
+            if status is not None:
+                dimensions_data[dimension][STATUS_KEYS[dimension]] = status
+        return dimensions_data
+
+    def copy(self) -> CompactTree:
+        return self.select(np.ones(len(self), dtype=bool))
+
+    def select(self, mask: np.ndarray, parents: np.ndarray | None = None) -> CompactTree:
+        """
+        Returns the tree with the nodes of `mask`, which must contain the parent of every node
+        it contains. `parents` replaces the parent of every node, so nodes can be reattached to
+        one of their kept ancestors.
+        """
+        parents = self.parents if parents is None else parents
+        new_indices = np.cumsum(mask) - 1
+        kept_parents = parents[mask]
+        return CompactTree(
+            self.names[mask],
+            self.depths[mask],
+            self.is_path_end[mask],
+            self.frequencies[mask],
+            np.where(kept_parents >= 0, new_indices[kept_parents], -1),
+            {
+                dimension: {metric: values[mask] for metric, values in metrics.items()}
+                for dimension, metrics in self.metrics.items()
+            },
+            {dimension: values[mask] for dimension, values in self.statuses.items()},
+        )
+
+    def prune_to_depth(self, max_depth: int) -> CompactTree:
+        mask = self.depths < max_depth
+        mask[0] = True
+        return self.select(mask)
+
+
+class CompactTreeNode:
+    """
+    Read-only view of a node of a `CompactTree` with the attributes of a `TreeNode`. The
+    dimensions data of the node is built on first access and kept by the view.
+    """
+
+    __slots__ = ("cached_dimensions_data", "index", "tree")
+
+    def __init__(self, tree: CompactTree, index: int) -> None:
+        self.tree: CompactTree = tree
+        self.index: int = index
+        self.cached_dimensions_data: dict | None = None
+
+    @property
+    def id(self) -> int:
+        return self.index
+
+    @property
+    def name(self) -> str:
+        return self.tree.names[self.index]
+
+    @property
+    def depth(self) -> int:
+        return int(self.tree.depths[self.index])
+
+    @property
+    def is_path_end(self) -> bool:
+        return bool(self.tree.is_path_end[self.index])
+
+    @property
+    def frequency(self) -> int:
+        return int(self.tree.frequencies[self.index])
+
+    @property
+    def dimensions_data(self) -> dict:
+        if self.cached_dimensions_data is None:
+            self.cached_dimensions_data = self.tree.dimensions_data(self.index)
+        return self.cached_dimensions_data
+
+    @property
+    def parent(self) -> CompactTreeNode | None:
+        parent = int(self.tree.parents[self.index])
+        return CompactTreeNode(self.tree, parent) if parent >= 0 else None
+
+    @property
+    def children(self) -> list[CompactTreeNode]:
+        return [
+            CompactTreeNode(self.tree, child)
+            for child in self.tree.children_of(self.index).tolist()
+        ]
+
+    def get_child_by_name_depth_and_end_status(
+        self, *, name: str, depth: int, is_path_end: bool
+    ) -> CompactTreeNode | None:
+        child = self.tree.child(self.index, name=name, is_path_end=is_path_end)
+        if child is not None and self.tree.depths[child] == depth:
+            return CompactTreeNode(self.tree, child)
+        return None
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, CompactTreeNode)
+            and other.tree is self.tree
+            and other.index == self.index
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.index))
+
+
+class CompactTreeBuilder:
+    """
+    Merges the partial trees of blocks of cases, as returned by `discover_partial_tree`, into
+    growing columns. Only the nodes of the block being merged are `TreeNode` objects, so the
+    memory used while building is that of the columns. Nodes are merged like
+    `TreeNode.merge` and the children of a node keep the order in which they were created.
+    """
+
+    def __init__(self) -> None:
+        dimensions_data = create_dimensions_data()
+        self.names: list[str] = []
+        self.depths: array = array("q")
+        self.is_path_end: array = array("b")
+        self.frequencies: array = array("q")
+        self.parents: array = array("q")
+        self.metrics: dict[str, dict[str, array]] = {
+            dimension: {metric: array("d") for metric in default_data}
+            for dimension, default_data in dimensions_data.items()
+        }
+        self.statuses: dict[str, list[str | None]] = {dimension: [] for dimension in STATUS_KEYS}
+        self.children_index: dict[tuple[int, str, bool], int] = {}
+        self.add_nodes([("root", -1, False, 0, dimensions_data, -1)])
+
+    def add_nodes(self, nodes: list[tuple]) -> None:
+        """Appends nodes given as tuples of the partial tree format with their parent index."""
+        if not nodes:
+            return
+        names, depths, is_path_end, frequencies, dimensions_data, parents = zip(*nodes)
+        self.names.extend(names)
+        self.depths.extend(depths)
+        self.is_path_end.extend(is_path_end)
+        self.frequencies.extend(frequencies)
+        self.parents.extend(parents)
+        for dimension, metrics in self.metrics.items():
+            data = [node_data[dimension] for node_data in dimensions_data]
+            convert = timedelta.total_seconds if dimension == "time" else float
+            for metric, values in metrics.items():
+                values.extend([convert(node_data[metric]) for node_data in data])
+        for dimension, status_key in STATUS_KEYS.items():
+            self.statuses[dimension].extend(
+                [node_data[dimension].get(status_key) for node_data in dimensions_data]
+            )
+
+    def merge_node(self, index: int, frequency: int, dimensions_data: dict) -> None:
+        self.frequencies[index] += frequency
+        for dimension, metrics in self.metrics.items():
+            data = dimensions_data[dimension]
+            convert = timedelta.total_seconds if dimension == "time" else float
+            for metric, values in metrics.items():
+                value = convert(data[metric])
+                if metric == "max":
+                    values[index] = max(values[index], value)
+                elif metric == "min":
+                    values[index] = min(values[index], value)
+                elif metric not in ("remainder", "lead_remainder"):
+                    values[index] += value
+            if dimension == "time":
+                metrics["lead_remainder"][index] = (
+                    metrics["lead_case"][index] - metrics["lead_accumulated"][index]
+                )
+            else:
+                metrics["remainder"][index] = (
+                    metrics["total_case"][index] - metrics["accumulated"][index]
+                )
+        for dimension, status_key in STATUS_KEYS.items():
+            if self.statuses[dimension][index] is None:
+                self.statuses[dimension][index] = dimensions_data[dimension].get(status_key)
+
+    def merge_partial_tree(self, partial_nodes: list[tuple]) -> None:
+        # Paths are unique in a partial tree, so its nodes are only merged into nodes of earlier
+        # blocks and the new ones can be appended together.
+        merged_nodes = [0]
+        new_nodes = []
+        for name, depth, is_path_end, frequency, dimensions_data, parent in partial_nodes[1:]:
+            parent_index = merged_nodes[parent]
+            key = (parent_index, name, is_path_end)
+            index = self.children_index.get(key)
+            if index is None:
+                index = len(self.names) + len(new_nodes)
+                self.children_index[key] = index
+                new_nodes.append(
+                    (name, depth, is_path_end, frequency, dimensions_data, parent_index)
+                )
+            else:
+                self.merge_node(index, frequency, dimensions_data)
+            merged_nodes.append(index)
+        self.add_nodes(new_nodes)
+
+    def update_root(self) -> None:
+        """Sums the first activities into the root like `DirectlyRootedTreeBuilder.update_root`."""
+        first_activities = [index for index, parent in enumerate(self.parents) if parent == 0]
+        self.frequencies[0] = sum(self.frequencies[index] for index in first_activities)
+        for dimension, metrics in self.metrics.items():
+            prefix = "lead" if dimension == "time" else "total"
+            for metric in [prefix, f"{prefix}_case"]:
+                metrics[metric][0] = sum(metrics[metric][index] for index in first_activities)
+            metrics["max"][0] = max(metrics["max"][index] for index in first_activities)
+            metrics["min"][0] = min(metrics["min"][index] for index in first_activities)
+            remainder = "lead_remainder" if dimension == "time" else "remainder"
+            metrics[remainder][0] = metrics[f"{prefix}_case"][0]
+
+    def get_tree(self) -> CompactTree:
+        """
+        Returns the compact tree with the root updated and the children of every node sorted by
+        frequency, like `DirectlyRootedTreeBuilder.order_tree_by_frequency`.
+        """
+        self.update_root()
+        parents = np.frombuffer(self.parents, dtype=np.int64)
+        frequencies = np.frombuffer(self.frequencies, dtype=np.int64)
+
+        nodes = np.arange(1, len(parents))
+        sorted_children = nodes[np.lexsort((nodes, frequencies[1:], parents[1:]))].tolist()
+        children_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(parents[1:], minlength=len(parents))))
+        ).tolist()
+        order = [0]
+        for node in order:
+            order.extend(sorted_children[children_offsets[node] : children_offsets[node + 1]])
+        order = np.array(order, dtype=np.int64)
+        new_indices = np.empty(len(order), dtype=np.int64)
+        new_indices[order] = np.arange(len(order))
+        ordered_parents = parents[order]
+
+        return CompactTree(
+            np.array(self.names, dtype=object)[order],
+            np.frombuffer(self.depths, dtype=np.int64)[order].astype(np.int32),
+            np.frombuffer(self.is_path_end, dtype=np.int8)[order].astype(bool),
+            frequencies[order],
+            np.where(ordered_parents >= 0, new_indices[ordered_parents], -1),
+            {
+                dimension: {
+                    metric: np.frombuffer(values, dtype=np.float64)[order]
+                    for metric, values in metrics.items()
+                }
+                for dimension, metrics in self.metrics.items()
+            },
+            {
+                dimension: np.array(values, dtype=object)[order]
+                for dimension, values in self.statuses.items()
+            },
+        )
@@ -12,3 +12,10 @@ class DirectlyRootedTreeParameters:
     calculate_cost: bool = True
     calculate_quality: bool = True
     calculate_flexibility: bool = True
+    aggregate_variants: bool = False
+    n_jobs: int = 1
+    compact: bool = False
+
+    def __post_init__(self):
+        if self.n_jobs == 0 or self.n_jobs < -1:
+            raise ValueError("Number of jobs must be a positive number or -1 to use every core")
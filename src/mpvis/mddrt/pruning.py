@@ -1,26 +1,85 @@
+from __future__ import annotations
+
+from mpvis.mddrt.compact_tree import CompactTree
 from mpvis.mddrt.tree_node import TreeNode
 
 
-def prune_tree_to_depth(node: TreeNode, max_depth: int) -> TreeNode:
+def prune_tree_to_depth(node: TreeNode | CompactTree, max_depth: int) -> TreeNode | CompactTree:
     """
     Prunes the tree to the specified maximum depth.
 
     Args:
-        node (TreeNode): The root node of the tree to prune.
+        node (TreeNode | CompactTree): The root node of the tree, or the compact tree, to prune.
         max_depth (int): The maximum depth to retain in the tree.
 
     Returns:
-        TreeNode: The pruned tree.
+        TreeNode | CompactTree: The pruned tree, of the same kind as the given one.
 
     """
-    node_copy = node.deep_copy()
-    prune_tree_to_depth_impl(node_copy, max_depth)
-    return node_copy
+    if isinstance(node, CompactTree):
+        return node.prune_to_depth(max_depth)
+    return node.deep_copy(max_depth)
+
+
+def pruned_tree_view(
+    node: TreeNode | CompactTree | PrunedTreeNode, max_depth: int
+) -> PrunedTreeNode:
+    """
+    Returns a view of the tree pruned to the specified maximum depth without copying it.
+
+    The view can be drawn with the multi-dimensional DRT diagram functions. It reflects later
+    changes to the tree, so many depths can be explored over the same tree.
+
+    Args:
+        node (TreeNode | CompactTree | PrunedTreeNode): The root node of the tree, the compact
+            tree or the pruned view to prune.
+        max_depth (int): The maximum depth to retain in the view.
+
+    Returns:
+        PrunedTreeNode: The root of the pruned view.
+
+    """
+    if isinstance(node, CompactTree):
+        node = node.root
+    elif isinstance(node, PrunedTreeNode):
+        node = node.node
+    return PrunedTreeNode(node, max_depth)
+
+
+class PrunedTreeNode:
+    """
+    Read-only view of a node of a tree pruned to a maximum depth. Nodes at depth max_depth - 1
+    have no children in the view and every other attribute is read from the wrapped node.
+    """
+
+    __slots__ = ("max_depth", "node")
+
+    def __init__(self, node: TreeNode, max_depth: int) -> None:
+        self.node: TreeNode = node
+        self.max_depth: int = max_depth
+
+    @property
+    def children(self) -> list[PrunedTreeNode]:
+        if self.node.depth >= self.max_depth - 1:
+            return []
+        return [PrunedTreeNode(child, self.max_depth) for child in self.node.children]
+
+    @property
+    def parent(self) -> PrunedTreeNode | None:
+        parent = self.node.parent
+        return PrunedTreeNode(parent, self.max_depth) if parent is not None else None
 
+    def get_child_by_name_depth_and_end_status(
+        self, *, name: str, depth: int, is_path_end: bool
+    ) -> PrunedTreeNode | None:
+        if self.node.depth >= self.max_depth - 1:
+            return None
+        child = self.node.get_child_by_name_depth_and_end_status(
+            name=name, depth=depth, is_path_end=is_path_end
+        )
+        return PrunedTreeNode(child, self.max_depth) if child is not None else None
 
-def prune_tree_to_depth_impl(node: TreeNode, max_depth: int) -> None:
-    if node.depth >= max_depth - 1:
-        node.children = []
-    else:
-        for child in node.children:
-            prune_tree_to_depth_impl(child, max_depth)
+    def __getattr__(self, name: str):
+        if name in PrunedTreeNode.__slots__:
+            raise AttributeError(name)
+        return getattr(self.node, name)
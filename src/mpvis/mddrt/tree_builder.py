@@ -1,115 +1,162 @@
 from __future__ import annotations
 
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import timedelta
+from itertools import repeat
 from typing import TYPE_CHECKING
 
+import numpy as np
 from tqdm import tqdm
 
+from mpvis.mddrt.case_sequences import CaseSequences, VariantSequences
+from mpvis.mddrt.compact_tree import CompactTree, CompactTreeBuilder
 from mpvis.mddrt.tree_node import TreeNode
-from mpvis.mddrt.utils.builder import calculate_cases_metrics, dimensions_to_calculate
+from mpvis.mddrt.utils.builder import (
+    calculate_cases_metrics,
+    calculate_mandatory_and_optional_activities,
+    dimensions_to_calculate,
+)
 
 if TYPE_CHECKING:
-    from collections.abc import Hashable
-
     import pandas as pd
-    from pandas.core.groupby import DataFrameGroupBy
 
+    from mpvis.mddrt.case_sequences import CaseSequence
     from mpvis.mddrt.drt_parameters import DirectlyRootedTreeParameters
 
+COMPACT_TREE_BLOCK_SIZE = 1_000
+
 
 class DirectlyRootedTreeBuilder:
-    def __init__(self, log: pd.DataFrame, params: DirectlyRootedTreeParameters) -> None:
+    def __init__(
+        self, log: pd.DataFrame | None, params: DirectlyRootedTreeParameters, build: bool = True
+    ) -> None:
         self.log: pd.DataFrame = log
         self.params: DirectlyRootedTreeParameters = params
-        self.tree: TreeNode = TreeNode(name="root", depth=-1, is_path_end=False)
-        self.cases: dict = {}
+        self.tree: TreeNode | CompactTree = TreeNode(name="root", depth=-1, is_path_end=False)
+        self.cases: CaseSequences | None = None
+        self.optional_activities: frozenset[str] = frozenset()
         self.dimensions_to_calculate: list[str] = dimensions_to_calculate(params)
-        self.build()
+        if build:
+            self.build()
 
     def build(self) -> None:
-        cases_grouped_by_id = self.log.groupby(self.params.case_id_key, dropna=True, sort=False)
-        self.build_cases(cases_grouped_by_id)
+        self.build_cases()
+        if self.params.compact:
+            self.build_compact_tree()
+            return
         self.build_tree()
         self.update_root()
         self.order_tree_by_frequency()
 
-    def build_cases(self, cases_grouped_by_id: DataFrameGroupBy) -> None:
-        cases = {}
-        cases_metrics = calculate_cases_metrics(self.log, self.params)
-        print("Building Tree Cases:")
-        for case in tqdm(cases_grouped_by_id):
-            case_id = case[0]
-            cases[case_id] = {}
-            case_activities = self.build_case_activities(case)
-            case_metrics = cases_metrics.loc[cases_metrics["Case Id"] == case_id].iloc[0]
-            cases[case_id]["activities"] = case_activities
-            metrics_mapping = {
-                "cost": "Cost",
-                "time": "Duration",
-                "flexibility": "Optionality",
-                "quality": "Rework",
-            }
-            for dimension in self.dimensions_to_calculate:
-                metric_value = case_metrics[metrics_mapping[dimension]]
-                if dimension == "time":
-                    metric_value = metric_value.to_pytimedelta()
-                cases[case_id][dimension] = metric_value
-
-        self.cases = cases
-
-    def build_case_activities(self, case: tuple[Hashable, pd.DataFrame]) -> list[dict[str, any]]:
-        case_df = case[1].sort_values(by=[self.params.timestamp_key])
-        case_df = case[1].sort_values(by=[self.params.start_timestamp_key])
-        return [self.build_activity_dict(case_df, i) for i in range(len(case_df))]
-
-    def build_activity_dict(self, case_df: pd.DataFrame, index: int) -> dict[str, any]:
-        actual_activity = case_df.iloc[index]
-        activity_dict = {
-            "name": actual_activity[self.params.activity_key],
-        }
-        if self.params.calculate_cost:
-            activity_dict["cost"] = actual_activity[self.params.cost_key]
-        if self.params.calculate_time:
-            activity_dict.update(self.calculate_time_data(case_df, index))
-        return activity_dict
-
-    def calculate_time_data(self, case_df: pd.DataFrame, index: int) -> dict[str, timedelta]:
-        actual_activity = case_df.iloc[index]
-        service_time = (
-            actual_activity[self.params.timestamp_key]
-            - actual_activity[self.params.start_timestamp_key]
-        ).to_pytimedelta()
-
-        prev_activity = case_df.iloc[index - 1] if index > 0 else None
-        waiting_time = (
-            (
-                actual_activity[self.params.start_timestamp_key]
-                - prev_activity[self.params.timestamp_key]
-            ).to_pytimedelta()
-            if prev_activity is not None
-            else timedelta(0)
-        )
-        return {"service_time": service_time, "waiting_time": waiting_time}
+    def build_cases(self) -> None:
+        num_mandatory_activities = None
+        if self.params.calculate_flexibility:
+            mandatory_activities, self.optional_activities = (
+                calculate_mandatory_and_optional_activities(self.log, self.params)
+            )
+            num_mandatory_activities = len(mandatory_activities)
+        cases_metrics = calculate_cases_metrics(self.log, self.params, num_mandatory_activities)
+        self.cases = CaseSequences(self.log, self.params, cases_metrics, self.optional_activities)
+
+    def get_sequences(self) -> CaseSequences | VariantSequences:
+        return VariantSequences(self.cases) if self.params.aggregate_variants else self.cases
 
     def build_tree(self) -> None:
         root = self.tree
         print("Building Tree Graph:")
-        for current_case in tqdm(self.cases.values()):
+        sequences = self.get_sequences()
+        if self.params.n_jobs != 1:
+            self.build_tree_in_parallel(sequences)
+            return
+        for current_case in tqdm(sequences):
             self.add_case_to_tree(root, current_case)
         self.tree = root
 
-    def add_case_to_tree(self, root: TreeNode, current_case: dict) -> None:
+    def build_tree_in_parallel(self, sequences: CaseSequences | VariantSequences) -> None:
+        """
+        Splits the cases into blocks of consecutive cases, builds the tree of each block in its
+        own process and merges the trees in block order. Merging in order creates the nodes in
+        the same order as a sequential build, so the children order and node ids are the same.
+        """
+        n_jobs = self.params.n_jobs if self.params.n_jobs > 0 else os.cpu_count()
+        blocks = [
+            block for block in np.array_split(np.arange(len(sequences)), n_jobs) if len(block)
+        ]
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            partial_trees = [
+                executor.submit(
+                    discover_partial_tree,
+                    [sequences[index] for index in block.tolist()],
+                    self.params,
+                )
+                for block in blocks
+            ]
+            for partial_tree in tqdm(partial_trees):
+                self.merge_partial_tree(partial_tree.result())
+
+    def build_compact_tree(self) -> None:
+        """
+        Builds the tree of every block of COMPACT_TREE_BLOCK_SIZE cases, in its own process when
+        n_jobs is not 1, and merges it into a `CompactTree` in block order. Only the nodes of a
+        block are `TreeNode` objects, and they are dropped once the block is merged.
+        """
+        print("Building Tree Graph:")
+        sequences = self.get_sequences()
+        compact_tree_builder = CompactTreeBuilder()
+        blocks = [
+            range(start, min(start + COMPACT_TREE_BLOCK_SIZE, len(sequences)))
+            for start in range(0, len(sequences), COMPACT_TREE_BLOCK_SIZE)
+        ]
+        blocks_sequences = ([sequences[index] for index in block] for block in blocks)
+        if self.params.n_jobs == 1:
+            for block_sequences in tqdm(blocks_sequences, total=len(blocks)):
+                compact_tree_builder.merge_partial_tree(
+                    discover_partial_tree(block_sequences, self.params)
+                )
+        else:
+            n_jobs = self.params.n_jobs if self.params.n_jobs > 0 else os.cpu_count()
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                partial_trees = executor.map(
+                    discover_partial_tree, blocks_sequences, repeat(self.params)
+                )
+                for partial_tree in tqdm(partial_trees, total=len(blocks)):
+                    compact_tree_builder.merge_partial_tree(partial_tree)
+        self.tree = compact_tree_builder.get_tree()
+
+    def merge_partial_tree(self, partial_nodes: list[tuple]) -> None:
+        merged_nodes = [self.tree]
+        for name, depth, is_path_end, frequency, dimensions_data, parent in partial_nodes[1:]:
+            parent_node = merged_nodes[parent]
+            node = parent_node.get_child_by_name_depth_and_end_status(
+                name=name, depth=depth, is_path_end=is_path_end
+            )
+            if node is None:
+                node = TreeNode(
+                    name=name,
+                    depth=depth,
+                    is_path_end=is_path_end,
+                    frequency=frequency,
+                    dimensions_data=dimensions_data,
+                )
+                node.set_parent(parent_node)
+                parent_node.add_children(node)
+            else:
+                node.merge(frequency, dimensions_data)
+            merged_nodes.append(node)
+
+    def add_case_to_tree(self, root: TreeNode, current_case: CaseSequence) -> None:
         parent_node = root
-        activities = current_case["activities"]
+        activities = current_case.activities
         for depth, activity in enumerate(activities):
             is_path_end = depth == len(activities) - 1
             current_node = self.get_or_create_node(
                 parent_node=parent_node,
-                activity_name=activity["name"],
+                activity_name=activity,
                 depth=depth,
                 is_path_end=is_path_end,
             )
-            current_node.update_frequency()
+            current_node.update_frequency(current_case.frequency)
             self.update_node_dimensions(current_node, depth, current_case)
             parent_node = current_node
 
@@ -125,7 +172,9 @@ class DirectlyRootedTreeBuilder:
             parent_node.add_children(current_node)
         return current_node
 
-    def update_node_dimensions(self, node: TreeNode, depth: int, current_case: dict) -> None:
+    def update_node_dimensions(
+        self, node: TreeNode, depth: int, current_case: CaseSequence
+    ) -> None:
         for dimension in self.dimensions_to_calculate:
             node.update_dimension(dimension, depth, current_case)
 
@@ -179,8 +228,42 @@ class DirectlyRootedTreeBuilder:
     def order_tree_by_frequency(self) -> None:
         self.tree.sort_by_frequency()
 
-    def get_tree(self) -> TreeNode:
+    def get_tree(self) -> TreeNode | CompactTree:
         if not self.tree:
             msg = "Tree not built yet."
             raise ValueError(msg)
         return self.tree
+
+
+def discover_partial_tree(
+    sequences: list[CaseSequence], params: DirectlyRootedTreeParameters
+) -> list[tuple]:
+    """
+    Builds the tree of a block of cases and returns its nodes in creation order as tuples of
+    name, depth, path end status, frequency, dimensions data and position of the parent node.
+    """
+    builder = DirectlyRootedTreeBuilder(None, params, build=False)
+    for current_case in sequences:
+        builder.add_case_to_tree(builder.tree, current_case)
+
+    nodes = [builder.tree]
+    for node in nodes:
+        nodes.extend(node.children)
+    nodes.sort(key=lambda node: node.id)
+    positions = {node.id: position for position, node in enumerate(nodes)}
+    partial_nodes = [
+        (
+            node.name,
+            node.depth,
+            node.is_path_end,
+            node.frequency,
+            node.dimensions_data,
+            positions[node.parent.id] if node.parent else -1,
+        )
+        for node in nodes
+    ]
+    # Unlinking the parents breaks the reference cycles, so the nodes are freed right away
+    # instead of waiting for the garbage collector.
+    for node in nodes:
+        node.set_parent(None)
+    return partial_nodes
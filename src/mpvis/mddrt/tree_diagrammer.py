@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from collections import deque
 from typing import TYPE_CHECKING, Callable, Literal
 
 import graphviz
 
+from mpvis.mddrt.compact_tree import CompactTree
 from mpvis.mddrt.utils.constants import (
     GRAPHVIZ_ACTIVITY,
     GRAPHVIZ_ACTIVITY_DATA,
@@ -18,6 +18,7 @@ from mpvis.mddrt.utils.diagrammer import (
     format_time,
     link_width,
 )
+from mpvis.mddrt.utils.traversal import breadth_first
 
 if TYPE_CHECKING:
     from datetime import timedelta
@@ -43,7 +44,7 @@ METRIC = Literal[
 class DirectlyRootedTreeDiagrammer:
     def __init__(
         self,
-        tree_root: TreeNode,
+        tree_root: TreeNode | CompactTree,
         visualize_time: bool = True,
         visualize_cost: bool = True,
         visualize_quality: bool = True,
@@ -52,7 +53,7 @@ class DirectlyRootedTreeDiagrammer:
         arc_measures: list[Literal["avg", "min", "max"]] = [],
         rankdir: str = "TB",
     ) -> None:
-        self.tree_root = tree_root
+        self.tree_root = tree_root.root if isinstance(tree_root, CompactTree) else tree_root
         self.dimensions_to_diagram = dimensions_to_diagram(
             visualize_time,
             visualize_cost,
@@ -72,13 +73,8 @@ class DirectlyRootedTreeDiagrammer:
         self.traverse_to_diagram(self.build_links)
 
     def traverse_to_diagram(self, diagram_routine: Callable[[TreeNode], None]) -> None:
-        queue = deque([self.tree_root])
-
-        while queue:
-            current_node = queue.popleft()
-            diagram_routine(current_node)
-            for child in current_node.children:
-                queue.append(child)
+        for node in breadth_first(self.tree_root):
+            diagram_routine(node)
 
     def build_node(self, node: TreeNode) -> None:
         state_label = self.build_state_label(node)
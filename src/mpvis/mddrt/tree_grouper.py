@@ -1,32 +1,46 @@
 from __future__ import annotations
 
-from datetime import timedelta
+import numpy as np
 
+from mpvis.mddrt.compact_tree import STATUS_KEYS, CompactTree
 from mpvis.mddrt.tree_node import TreeNode
+from mpvis.mddrt.utils.traversal import postorder
+
+LAST_NODE_METRICS = {"accumulated", "remainder", "lead_accumulated", "lead_remainder"}
+SUMMED_METRICS = {"total", "lead", "service", "waiting"}
 
 
 class DirectedRootedTreeGrouper:
-    def __init__(self, tree: TreeNode, show_names: bool = False) -> None:
-        self.tree: TreeNode = tree
+    def __init__(self, tree: TreeNode | CompactTree, show_names: bool = False) -> None:
+        self.tree: TreeNode | CompactTree = tree
         self.show_names: bool = show_names
         self.start_group()
 
     def start_group(self) -> None:
-        import sys
-
-        sys.setrecursionlimit(10**6)
-
-        for child in self.tree.children:
-            self.traverse_to_group(child)
-
-    def traverse_to_group(self, node: TreeNode) -> None:
-        nodes_to_group = self.collect_nodes_to_group(node)
-
-        if nodes_to_group:
-            self.group_nodes(node.parent, nodes_to_group)
-
-        for child in node.children:
-            self.traverse_to_group(child)
+        if isinstance(self.tree, CompactTree):
+            self.tree = self.group_compact_tree(self.tree)
+            return
+
+        for node in postorder(self.tree):
+            if node is self.tree or not self.has_single_child(node):
+                self.group_children(node)
+
+    def group_children(self, parent_node: TreeNode) -> None:
+        """
+        Replaces every child of a node that starts a chain of nodes with a single child by the
+        grouped node of the chain. The subtrees of the children are already grouped, as the
+        nodes are visited in post-order, and the children are set once per parent.
+        """
+        if not any(self.has_single_child(child) for child in parent_node.children):
+            return
+        parent_node.set_children(
+            [
+                self.group_nodes(parent_node, self.collect_nodes_to_group(child))
+                if self.has_single_child(child)
+                else child
+                for child in parent_node.children
+            ]
+        )
 
     def collect_nodes_to_group(self, node: TreeNode) -> list[TreeNode]:
         nodes_to_group = []
@@ -44,12 +58,13 @@ class DirectedRootedTreeGrouper:
     def has_single_child(self, node: TreeNode) -> bool:
         return len(node.children) == 1
 
-    def group_nodes(self, parent_node: TreeNode, nodes: list[TreeNode]) -> None:
+    def group_nodes(self, parent_node: TreeNode, nodes: list[TreeNode]) -> TreeNode:
         new_node_name = self.create_new_node_name(nodes)
         new_node = TreeNode(name=new_node_name, depth=nodes[0].depth, is_path_end=False)
 
         self.group_dimensions_data_in_new_node(new_node, nodes)
         self.replace_old_nodes_with_new(parent_node, new_node, nodes)
+        return new_node
 
     def create_new_node_name(self, nodes: list[TreeNode]) -> str:
         if not self.show_names:
@@ -57,94 +72,111 @@ class DirectedRootedTreeGrouper:
                 f"{len(nodes)} activities,<br/> from {nodes[0].name} <br/>to {nodes[-1].name} <br/>"
             )
 
-        node_name = f"{len(nodes)} activities, <br/>"
-        for node in nodes:
-            node_name += f"{node.name} <br/>"
-        return node_name
+        return f"{len(nodes)} activities, <br/>" + "".join(f"{node.name} <br/>" for node in nodes)
 
     def replace_old_nodes_with_new(
         self, parent_node: TreeNode, new_node: TreeNode, nodes: list[TreeNode]
     ) -> None:
-        first_node_index = parent_node.children.index(nodes[0])
-        parent_node.children[first_node_index] = new_node
-        new_node.children = nodes[-1].children
+        new_node.set_children(nodes[-1].children)
+        for child in new_node.children:
+            child.set_parent(new_node)
         new_node.set_parent(parent_node)
 
     def group_dimensions_data_in_new_node(
         self, grouped_node: TreeNode, nodes: list[TreeNode]
     ) -> None:
+        """
+        Aggregates the dimensions data of the chain in one sweep over its nodes. The grouped
+        node starts with the data of the first node, takes the accumulated and remainder
+        metrics of the last node, adds up the totals and keeps the lowest min and highest max.
+        """
         first_node = nodes[0]
         last_node = nodes[-1]
 
         grouped_node.frequency = first_node.frequency
-
-        for dimension, data in first_node.dimensions_data.items():
-            if dimension == "time":
-                self.group_time_dimension_in_new_node(grouped_node, nodes)
-                continue
-
+        grouped_node.dimensions_data = {
+            dimension: dict(data) for dimension, data in first_node.dimensions_data.items()
+        }
+        statuses_counts = dict.fromkeys(STATUS_KEYS, 0)
+
+        for index, node in enumerate(nodes):
+            for dimension, data in node.dimensions_data.items():
+                grouped_data = grouped_node.dimensions_data[dimension]
+                if index > 0:
+                    for metric in SUMMED_METRICS.intersection(data):
+                        grouped_data[metric] += data[metric]
+                    grouped_data["min"] = min(grouped_data["min"], data["min"])
+                    grouped_data["max"] = max(grouped_data["max"], data["max"])
+                if data.get(STATUS_KEYS.get(dimension)) == "Yes":
+                    statuses_counts[dimension] += 1
+
+        for dimension, data in last_node.dimensions_data.items():
             grouped_data = grouped_node.dimensions_data[dimension]
-
-            grouped_data["total_case"] = data["total_case"]
-            grouped_data["accumulated"] = last_node.dimensions_data[dimension]["accumulated"]
-            grouped_data["remainder"] = last_node.dimensions_data[dimension]["remainder"]
-
-            grouped_data["total"] = self.calculate_total(nodes, dimension)
-            grouped_data["min"] = self.calculate_min(nodes, dimension)
-            grouped_data["max"] = self.calculate_max(nodes, dimension)
-
-            if dimension == "quality":
-                qty_of_reworked_activities = sum(
-                    1 for node in nodes if node.dimensions_data["quality"]["is_rework"] == "Yes"
-                )
-
-                grouped_data["is_rework"] = (
-                    f"{qty_of_reworked_activities} reworked activities in group"
+            for metric in LAST_NODE_METRICS.intersection(data):
+                grouped_data[metric] = data[metric]
+            if dimension in STATUS_KEYS:
+                status_name = "reworked" if dimension == "quality" else "optional"
+                grouped_data[STATUS_KEYS[dimension]] = (
+                    f"{statuses_counts[dimension]} {status_name} activities in group"
                 )
 
-            if dimension == "flexibility":
-                qty_of_optional_activities = sum(
-                    1
-                    for node in nodes
-                    if node.dimensions_data["flexibility"]["is_optional"] == "Yes"
-                )
-
-                grouped_data["is_optional"] = (
-                    f"{qty_of_optional_activities} optional activities in group"
+    def group_compact_tree(self, tree: CompactTree) -> CompactTree:
+        children_counts = np.diff(tree.children_offsets).tolist()
+        parents = tree.parents.tolist()
+        first_children = np.append(tree.children_indices, 0)[tree.children_offsets[:-1]].tolist()
+        chains = []
+        for node in range(1, len(tree)):
+            parent = parents[node]
+            if children_counts[node] != 1 or (parent != 0 and children_counts[parent] == 1):
+                continue
+            chain = [node]
+            while children_counts[chain[-1]] == 1:
+                chain.append(first_children[chain[-1]])
+            chains.append(chain)
+
+        grouped_tree = tree.copy()
+        if not chains:
+            return grouped_tree
+
+        chains_nodes = np.concatenate(chains)
+        chains_sizes = np.array([len(chain) for chain in chains], dtype=np.int64)
+        chains_starts = np.concatenate((np.zeros(1, dtype=np.int64), np.cumsum(chains_sizes[:-1])))
+        chains_ends = chains_starts + chains_sizes - 1
+        first_nodes = chains_nodes[chains_starts]
+        last_nodes = chains_nodes[chains_ends]
+
+        for dimension, metrics in grouped_tree.metrics.items():
+            for metric, values in metrics.items():
+                chains_values = values[chains_nodes]
+                if metric in LAST_NODE_METRICS:
+                    values[first_nodes] = values[last_nodes]
+                elif metric in SUMMED_METRICS:
+                    values[first_nodes] = np.add.reduceat(chains_values, chains_starts)
+                elif metric == "min":
+                    values[first_nodes] = np.minimum.reduceat(chains_values, chains_starts)
+                elif metric == "max":
+                    values[first_nodes] = np.maximum.reduceat(chains_values, chains_starts)
+
+            if dimension in grouped_tree.statuses:
+                statuses = grouped_tree.statuses[dimension]
+                statuses_counts = np.add.reduceat(
+                    (statuses[chains_nodes] == "Yes").astype(np.int64), chains_starts
                 )
-
-    def group_time_dimension_in_new_node(
-        self, grouped_node: TreeNode, nodes: list[TreeNode]
-    ) -> None:
-        first_node = nodes[0]
-        last_node = nodes[-1]
-
-        grouped_data = grouped_node.dimensions_data["time"]
-        grouped_data["lead_case"] = first_node.dimensions_data["time"]["lead_case"]
-        grouped_data["lead_accumulated"] = last_node.dimensions_data["time"]["lead_accumulated"]
-        grouped_data["lead_remainder"] = last_node.dimensions_data["time"]["lead_remainder"]
-
-        grouped_data["lead"] = self.calculate_total(nodes, "time")
-        grouped_data["min"] = self.calculate_min(nodes, "time")
-        grouped_data["max"] = self.calculate_max(nodes, "time")
-
-        grouped_data["service"] = sum(
-            [node.dimensions_data["time"]["service"] for node in nodes], timedelta()
-        )
-        grouped_data["waiting"] = sum(
-            [node.dimensions_data["time"]["waiting"] for node in nodes], timedelta()
-        )
-
-    def calculate_total(self, nodes: list[TreeNode], dimension: str) -> int | float | timedelta:
-        if dimension == "time":
-            return sum([node.dimensions_data["time"]["lead"] for node in nodes], timedelta())
-        return sum(node.dimensions_data[dimension]["total"] for node in nodes)
-
-    def calculate_min(self, nodes: list[TreeNode], dimension: str) -> int | float | timedelta:
-        return min(node.dimensions_data[dimension]["min"] for node in nodes)
-
-    def calculate_max(self, nodes: list[TreeNode], dimension: str) -> int | float | timedelta:
-        return max(node.dimensions_data[dimension]["max"] for node in nodes)
-
-    def get_tree(self) -> TreeNode:
+                status_name = "reworked" if dimension == "quality" else "optional"
+                statuses[first_nodes] = [
+                    f"{count} {status_name} activities in group" for count in statuses_counts
+                ]
+
+        grouped_tree.names[first_nodes] = [
+            self.create_new_node_name([tree.node(node) for node in chain]) for chain in chains
+        ]
+        grouped_tree.is_path_end[first_nodes] = False
+
+        groups = np.arange(len(tree))
+        for chain in chains:
+            groups[chain] = chain[0]
+        parents = np.where(tree.parents >= 0, groups[tree.parents], -1)
+        return grouped_tree.select(groups == np.arange(len(tree)), parents)
+
+    def get_tree(self) -> TreeNode | CompactTree:
         return self.tree
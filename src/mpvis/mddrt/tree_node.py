@@ -1,37 +1,51 @@
 from __future__ import annotations
 
 import copy
-import sys
+from datetime import timedelta
 from typing import TYPE_CHECKING, Literal
 
-from mpvis.mddrt.utils.builder import activities_dimension_cumsum, create_dimensions_data
+from mpvis.mddrt.utils.builder import create_dimensions_data
 from mpvis.mddrt.utils.misc import pretty_format_dict
-from mpvis.mddrt.utils.optional_activities import OptionalActivities
-
-sys.setrecursionlimit(10**6)
+from mpvis.mddrt.utils.traversal import preorder
 
 if TYPE_CHECKING:
-    from datetime import timedelta
+    from mpvis.mddrt.case_sequences import CaseSequence
 
 
 class TreeNode:
     id: int = 0
 
-    def __init__(self, *, name: str, depth: int, is_path_end: bool) -> None:
+    def __init__(
+        self,
+        *,
+        name: str,
+        depth: int,
+        is_path_end: bool,
+        frequency: int = 0,
+        dimensions_data: dict | None = None,
+    ) -> None:
         self.id: int = TreeNode.id
         self.name: str = name
         self.depth: int = depth
-        self.frequency: int = 0
+        self.frequency: int = frequency
         self.dimensions_data: dict[Literal["cost", "time", "flexibility", "quality"], dict] = (
-            create_dimensions_data()
+            create_dimensions_data() if dimensions_data is None else dimensions_data
         )
         self.parent: TreeNode = None
         self.children: list[TreeNode] = []
+        self.children_index: dict[tuple[str, bool], TreeNode] = {}
         self.is_path_end: bool = is_path_end
         TreeNode.id += 1
 
     def add_children(self, node: TreeNode) -> None:
         self.children.append(node)
+        self.children_index.setdefault((node.name, node.is_path_end), node)
+
+    def set_children(self, nodes: list[TreeNode]) -> None:
+        self.children = []
+        self.children_index = {}
+        for node in nodes:
+            self.add_children(node)
 
     def set_parent(self, parent_node: TreeNode) -> None:
         self.parent = parent_node
@@ -39,15 +53,15 @@ class TreeNode:
     def get_child_by_name_depth_and_end_status(
         self, *, name: str, depth: int, is_path_end: bool
     ) -> TreeNode | None:
-        for child in self.children:
-            if child.name == name and child.depth == depth and child.is_path_end == is_path_end:
-                return child
+        child = self.children_index.get((name, is_path_end))
+        if child is not None and child.depth == depth:
+            return child
         return None
 
-    def update_frequency(self) -> None:
-        self.frequency += 1
+    def update_frequency(self, frequency: int = 1) -> None:
+        self.frequency += frequency
 
-    def update_dimension(self, dimension: str, depth: int, current_case: dict) -> None:
+    def update_dimension(self, dimension: str, depth: int, current_case: CaseSequence) -> None:
         update_methods = {
             "time": self.update_time_dimension,
             "cost": self.update_cost_dimension,
@@ -58,56 +72,59 @@ class TreeNode:
         if dimension in update_methods:
             update_methods[dimension](depth, current_case)
 
-    def update_time_dimension(self, depth: int, current_case: dict) -> None:
+    def update_time_dimension(self, depth: int, current_case: CaseSequence) -> None:
         time_data = self.dimensions_data["time"]
-        activity = current_case["activities"][depth]
 
-        service_time = activity["service_time"]
-        waiting_time = activity["waiting_time"]
+        service_time = timedelta(microseconds=current_case.service_times[depth])
+        waiting_time = timedelta(microseconds=current_case.waiting_times[depth])
         lead_time = service_time + waiting_time
-        lead_accumulated = activities_dimension_cumsum(current_case, "time")[depth]
+        lead_accumulated = timedelta(microseconds=current_case.accumulated["time"][depth])
         time_data["service"] += service_time
         time_data["waiting"] += waiting_time
         time_data["lead"] += lead_time
-        time_data["lead_case"] += current_case["time"]
+        time_data["lead_case"] += timedelta(microseconds=current_case.metrics["time"])
         time_data["lead_accumulated"] += lead_accumulated
         time_data["lead_remainder"] = time_data["lead_case"] - time_data["lead_accumulated"]
-        self.update_min_max(time_data, service_time)
+        self.update_min_max(
+            time_data,
+            timedelta(microseconds=current_case.min_values["time"][depth]),
+            timedelta(microseconds=current_case.max_values["time"][depth]),
+        )
 
-    def update_cost_dimension(self, depth: int, current_case: dict) -> None:
+    def update_cost_dimension(self, depth: int, current_case: CaseSequence) -> None:
         dimension_data = self.dimensions_data["cost"]
-        activity_cost = current_case["activities"][depth]["cost"]
-        cost_cumsum = activities_dimension_cumsum(current_case, "cost")
+        activity_cost = current_case.costs[depth]
 
         self.update_cumulative_data(
-            dimension_data, activity_cost, cost_cumsum[depth], current_case["cost"]
+            dimension_data,
+            activity_cost,
+            current_case.accumulated["cost"][depth],
+            current_case.metrics["cost"],
+        )
+        self.update_min_max(
+            dimension_data,
+            current_case.min_values["cost"][depth],
+            current_case.max_values["cost"][depth],
         )
-        self.update_min_max(dimension_data, activity_cost)
 
-    def update_quality_dimension(self, depth: int, current_case: dict) -> None:
+    def update_quality_dimension(self, depth: int, current_case: CaseSequence) -> None:
         dimension_data = self.dimensions_data["quality"]
-        activities_till_depth = [activity["name"] for activity in current_case["activities"]][
-            : depth + 1
-        ]
-        accumulated_rework = len(activities_till_depth) - len(set(activities_till_depth))
+        accumulated_rework = current_case.accumulated["quality"][depth]
         self.update_cumulative_data(
-            dimension_data, accumulated_rework, accumulated_rework, current_case["quality"]
+            dimension_data, accumulated_rework, accumulated_rework, current_case.metrics["quality"]
         )
-        self.set_rework_status(current_case["activities"])
+        self.set_rework_status(is_rework=current_case.is_rework[depth])
 
-    def update_flexibility_dimension(self, depth: int, current_case: dict) -> None:
+    def update_flexibility_dimension(self, depth: int, current_case: CaseSequence) -> None:
         dimension_data = self.dimensions_data["flexibility"]
-        case_activities = [activity["name"] for activity in current_case["activities"]]
-        optional_activities = OptionalActivities().get_activities()
-        activities_till_depth = case_activities[: depth + 1]
-        accumulated_optionality = len(set(activities_till_depth) & set(optional_activities))
+        accumulated_optionality = current_case.accumulated["flexibility"][depth]
         self.update_cumulative_data(
             dimension_data,
             accumulated_optionality,
             accumulated_optionality,
-            current_case["flexibility"],
+            current_case.metrics["flexibility"],
         )
-        self.set_optional_status(optional_activities)
+        self.set_optional_status(is_optional=current_case.is_optional[depth])
 
     def update_cumulative_data(
         self,
@@ -121,46 +138,72 @@ class TreeNode:
         dimension_data["accumulated"] += dimension_cumsum
         dimension_data["remainder"] = dimension_data["total_case"] - dimension_data["accumulated"]
 
-    def update_min_max(self, dimension_data: dict, value_to_compare: float | timedelta) -> None:
-        dimension_data["max"] = max(dimension_data["max"], value_to_compare)
-        dimension_data["min"] = min(dimension_data["min"], value_to_compare)
+    def merge(self, frequency: int, dimensions_data: dict) -> None:
+        """Adds the frequency and dimensions data of a node of another tree at the same path."""
+        self.frequency += frequency
+        for dimension, data in dimensions_data.items():
+            node_data = self.dimensions_data[dimension]
+            for metric, value in data.items():
+                if metric == "max":
+                    node_data[metric] = max(node_data[metric], value)
+                elif metric == "min":
+                    node_data[metric] = min(node_data[metric], value)
+                elif metric in ("is_rework", "is_optional"):
+                    node_data.setdefault(metric, value)
+                elif metric not in ("remainder", "lead_remainder"):
+                    node_data[metric] += value
+            if dimension == "time":
+                node_data["lead_remainder"] = node_data["lead_case"] - node_data["lead_accumulated"]
+            else:
+                node_data["remainder"] = node_data["total_case"] - node_data["accumulated"]
+
+    def update_min_max(
+        self,
+        dimension_data: dict,
+        min_value_to_compare: float | timedelta,
+        max_value_to_compare: float | timedelta,
+    ) -> None:
+        dimension_data["max"] = max(dimension_data["max"], max_value_to_compare)
+        dimension_data["min"] = min(dimension_data["min"], min_value_to_compare)
 
-    def set_optional_status(self, optional_activities: list[str]) -> None:
+    def set_optional_status(self, *, is_optional: bool) -> None:
         if "is_optional" in self.dimensions_data["flexibility"]:
             return
-        if self.name in optional_activities:
-            self.dimensions_data["flexibility"]["is_optional"] = "Yes"
-        else:
-            self.dimensions_data["flexibility"]["is_optional"] = "No"
-
-    def set_rework_status(self, current_case_activities: list[str]):
-        prev_activities = [act["name"] for act in current_case_activities[: self.depth]]
+        self.dimensions_data["flexibility"]["is_optional"] = "Yes" if is_optional else "No"
 
+    def set_rework_status(self, *, is_rework: bool) -> None:
         if "is_rework" in self.dimensions_data["quality"]:
             return
-        if self.name in prev_activities:
-            self.dimensions_data["quality"]["is_rework"] = "Yes"
-        else:
-            self.dimensions_data["quality"]["is_rework"] = "No"
-
-    def deep_copy(self):
-        def copy_node(node: TreeNode, parent: TreeNode = None) -> TreeNode:
-            new_node = TreeNode(node.name, node.depth)
-            new_node.frequency = node.frequency
-            new_node.dimensions_data = copy.deepcopy(node.dimensions_data)
-            new_node.parent = parent
-
+        self.dimensions_data["quality"]["is_rework"] = "Yes" if is_rework else "No"
+
+    def deep_copy(self, max_depth: int | None = None) -> TreeNode:
+        """Copies the tree, leaving out the nodes deeper than `max_depth` - 1 when it is given."""
+
+        def copy_node(node: TreeNode) -> TreeNode:
+            return TreeNode(
+                name=node.name,
+                depth=node.depth,
+                is_path_end=node.is_path_end,
+                frequency=node.frequency,
+                dimensions_data=copy.deepcopy(node.dimensions_data),
+            )
+
+        root_copy = copy_node(self)
+        stack = [(self, root_copy)]
+        while stack:
+            node, node_copy = stack.pop()
+            if max_depth is not None and node.depth >= max_depth - 1:
+                continue
             for child in node.children:
-                new_node.children.append(copy_node(child, new_node))
-
-            return new_node
-
-        return copy_node(self)
-
-    def sort_by_frequency(self):
-        self.children.sort(key=lambda node: node.frequency)
-        for child in self.children:
-            child.sort_by_frequency()
+                child_copy = copy_node(child)
+                child_copy.set_parent(node_copy)
+                node_copy.add_children(child_copy)
+                stack.append((child, child_copy))
+        return root_copy
+
+    def sort_by_frequency(self) -> None:
+        for node in preorder(self):
+            node.children.sort(key=lambda child: child.frequency)
 
     def __str__(self) -> str:
         return f"""
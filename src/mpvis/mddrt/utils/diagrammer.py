@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from collections import deque
 from datetime import timedelta
 from typing import TYPE_CHECKING, Literal
 
@@ -11,6 +10,7 @@ from mpvis.mddrt.utils.color_schemes import (
     QUALITY_COLOR_SCHEME,
     TIME_COLOR_SCHEME,
 )
+from mpvis.mddrt.utils.traversal import breadth_first
 
 if TYPE_CHECKING:
     from mpvis.mddrt.tree_node import TreeNode
@@ -21,11 +21,7 @@ def dimensions_min_and_max(tree_root: TreeNode) -> dict[str, list[int]]:
     for dimension in tree_root.dimensions_data:
         dimensions_min_and_max[dimension] = [float("inf"), 0]
 
-    queue = deque([tree_root])
-
-    while queue:
-        current_node = queue.popleft()
-
+    for current_node in breadth_first(tree_root):
         dimensions_min_and_max["frequency"][0] = min(
             dimensions_min_and_max["frequency"][0], current_node.frequency
         )
@@ -46,9 +42,6 @@ def dimensions_min_and_max(tree_root: TreeNode) -> dict[str, list[int]]:
                 dimensions_min_and_max[dimension][1], dimension_avg_total_case
             )
 
-        for child in current_node.children:
-            queue.append(child)
-
     return dimensions_min_and_max
 
 
@@ -1,6 +1,7 @@
-from collections import deque
 from pathlib import Path
 
+from mpvis.mddrt.utils.traversal import breadth_first
+
 
 def pretty_format_dict(d: dict, indent: int = 0) -> str:
     pretty_str = ""
@@ -22,13 +23,7 @@ def pretty_format_dict(d: dict, indent: int = 0) -> str:
 
 
 def bfs(root, write_to_file: bool = False) -> None:
-    queue = deque([root])
-
-    while queue:
-        current_node = queue.popleft()
+    for current_node in breadth_first(root):
         if write_to_file:
             with open("data/new_tree.txt", "+a") as f:
                 f.write(str(current_node))
-
-        for child in current_node.children:
-            queue.append(child)
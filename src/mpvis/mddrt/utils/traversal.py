@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from mpvis.mddrt.tree_node import TreeNode
+
+
+def preorder(root: TreeNode) -> Iterator[TreeNode]:
+    """
+    Yields the nodes of the tree in depth-first pre-order with an explicit stack. The children
+    of a node are read after it is yielded, so they can be changed while traversing.
+    """
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
+
+def postorder(root: TreeNode) -> Iterator[TreeNode]:
+    """Yields the nodes of the tree in depth-first post-order with an explicit stack."""
+    stack = [(root, False)]
+    while stack:
+        node, children_visited = stack.pop()
+        if children_visited:
+            yield node
+            continue
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(node.children))
+
+
+def breadth_first(root: TreeNode) -> Iterator[TreeNode]:
+    """
+    Yields the nodes of the tree level by level. The children of a node are read after it is
+    yielded, so they can be changed while traversing.
+    """
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        yield node
+        queue.extend(node.children)
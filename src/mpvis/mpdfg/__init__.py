@@ -1,7 +1,9 @@
 r"""Functions to discover and visualize multi perspective DFGs"""
 
 from mpvis.mpdfg.actions import (
+    create_multi_perspective_dfg_filter,
     discover_multi_perspective_dfg,
+    discover_multi_perspective_dfg_from_file,
     filter_multi_perspective_dfg_activities,
     filter_multi_perspective_dfg_paths,
     get_multi_perspective_dfg_string,
@@ -4,6 +4,7 @@ from typing import Literal, Tuple
 import pandas as pd
 
 from mpvis.mpdfg.dfg import DirectlyFollowsGraph
+from mpvis.mpdfg.dfg_filter import DirectlyFollowsGraphFilter
 from mpvis.mpdfg.dfg_parameters import DirectlyFollowsGraphParameters
 from mpvis.mpdfg.diagrammers.graphviz import GraphVizDiagrammer
 from mpvis.mpdfg.diagrammers.mermaid import MermaidDiagrammer
@@ -13,6 +14,7 @@ from mpvis.mpdfg.utils.actions import (
     view_graphviz_diagram,
 )
 from mpvis.mpdfg.utils.filters import filter_dfg_activities, filter_dfg_paths
+from mpvis.mpdfg.utils.reader import read_log_batches
 
 
 def discover_multi_perspective_dfg(
@@ -26,8 +28,11 @@ def discover_multi_perspective_dfg(
     calculate_time: bool = True,
     calculate_cost: bool = True,
     frequency_statistic: str = "absolute-activity",
-    time_statistic: str = "mean",
-    cost_statistic: str = "mean",
+    time_statistic: str | list[str] = "mean",
+    cost_statistic: str | list[str] = "mean",
+    engine: str = "vectorized",
+    quantile_error: float | None = None,
+    n_jobs: int = 1,
 ) -> Tuple[dict, dict, dict]:
     """
     Discovers a multi-perspective Directly-Follows Graph (DFG) from a log.
@@ -43,8 +48,11 @@ def discover_multi_perspective_dfg(
         calculate_time (bool, optional): Whether to calculate activity times. Defaults to True.
         calculate_cost (bool, optional): Whether to calculate activity costs. Defaults to True.
         frequency_statistic (str , optional): The statistic to use for activity frequencies. Valid values are "absolute-activity", "absolute-case", "relative-case" and "relative-activity". Defaults to "absolute-activity".
-        time_statistic (str, optional): The statistic to use for activity times. Valid values are "mean", "sum", "max", "min", "median" and "stdev". Defaults to "mean".
-        cost_statistic (str, optional): The statistic to use for activity costs. Valid values are "mean, "sum", "max", "min", "median" and "stdev". Defaults to "mean".
+        time_statistic (str | list[str], optional): The statistic to use for activity times. Valid values are "mean", "sum", "max", "min", "median", "stdev" and percentiles like "p95". A list of statistics computes all of them in a single pass: the first one is shown by default and every one is kept under the "statistics" key of the DFG, so diagrams can switch between them. Defaults to "mean".
+        cost_statistic (str | list[str], optional): The statistic to use for activity costs. Valid values are "mean, "sum", "max", "min", "median", "stdev" and percentiles like "p95". Accepts a list of statistics in the same way as time_statistic. Defaults to "mean".
+        engine (str, optional): The discovery engine to use. "vectorized" aggregates the whole log with columnar operations, while "rowwise" walks every case event by event and is kept to cross-check results. Defaults to "vectorized".
+        quantile_error (float | None, optional): The approximate rank error allowed when computing the "median" and percentile statistics. When None the median is exact, which keeps every sample in memory; otherwise a bounded-size quantile sketch is used. Defaults to None.
+        n_jobs (int, optional): The number of processes used by the vectorized engine. Cases are split into partitions by hashing their ids, each partition is discovered in its own process and the partial graphs are merged, giving the same result as a single process. Use -1 to use every core. Defaults to 1.
 
     Returns:
         Tuple[dict, dict, dict]: A tuple containing the multi-perspective DFG, start activities, and end activities.
@@ -62,6 +70,9 @@ def discover_multi_perspective_dfg(
         frequency_statistic,
         time_statistic,
         cost_statistic,
+        engine,
+        quantile_error,
+        n_jobs,
     )
     dfg = DirectlyFollowsGraph(log, dfg_parameters)
     dfg.build()
@@ -71,6 +82,86 @@ def discover_multi_perspective_dfg(
     return multi_perspective_dfg, start_activities, end_activities
 
 
+def discover_multi_perspective_dfg_from_file(
+    source,
+    case_id_key: str = "case:concept:name",
+    activity_key: str = "concept:name",
+    timestamp_key: str = "time:timestamp",
+    start_timestamp_key: str = "start_timestamp",
+    cost_key: str = "cost:total",
+    calculate_frequency: bool = True,
+    calculate_time: bool = True,
+    calculate_cost: bool = True,
+    frequency_statistic: str = "absolute-activity",
+    time_statistic: str | list[str] = "mean",
+    cost_statistic: str | list[str] = "mean",
+    quantile_error: float | None = None,
+    batch_size: int = 1_000_000,
+    file_format: str | None = None,
+    timestamp_format: str | None = None,
+) -> Tuple[dict, dict, dict]:
+    """
+    Discovers a multi-perspective Directly-Follows Graph (DFG) from an event log stored on disk, without loading the whole log in memory.
+
+    Args:
+        source (str | Path | list | pyarrow.dataset.Dataset): A Parquet or CSV file, a directory of them, a list of files or a pyarrow dataset.
+        case_id_key (str, optional): The column name for the case ID. Defaults to "case:concept:name".
+        activity_key (str, optional): The column name for the activity name. Defaults to "concept:name".
+        timestamp_key (str, optional): The column name for the timestamp. Defaults to "time:timestamp".
+        start_timestamp_key (str, optional): The column name for the start timestamp. If the column does not exist the timestamp is used. Defaults to "start_timestamp".
+        cost_key (str, optional): The column name for the cost. If the column does not exist costs are 0. Defaults to "cost:total".
+        calculate_frequency (bool, optional): Whether to calculate activity frequencies. Defaults to True.
+        calculate_time (bool, optional): Whether to calculate activity times. Defaults to True.
+        calculate_cost (bool, optional): Whether to calculate activity costs. Defaults to True.
+        frequency_statistic (str , optional): The statistic to use for activity frequencies. Valid values are "absolute-activity", "absolute-case", "relative-case" and "relative-activity". Defaults to "absolute-activity".
+        time_statistic (str | list[str], optional): The statistic or statistics to use for activity times, as in discover_multi_perspective_dfg. Defaults to "mean".
+        cost_statistic (str | list[str], optional): The statistic or statistics to use for activity costs, as in discover_multi_perspective_dfg. Defaults to "mean".
+        quantile_error (float | None, optional): The approximate rank error allowed when computing the "median" and percentile statistics. Set it to keep memory bounded when those statistics are requested. Defaults to None.
+        batch_size (int, optional): The maximum number of events read and aggregated at once. Defaults to 1_000_000.
+        file_format (str | None, optional): The file format, "parquet" or "csv". Defaults to None, which infers it from the file extension.
+        timestamp_format (str | None, optional): The format string for the timestamp columns. Defaults to None.
+
+    Returns:
+        Tuple[dict, dict, dict]: A tuple containing the multi-perspective DFG, start activities, and end activities.
+
+    Note:
+        Events are expected to be ordered by start timestamp in the file. Each batch is sorted before being aggregated, and every case keeps its last activity and end timestamp between batches so that cases spanning several batches are stitched together. Memory grows with the batch size and the number of cases, not with the number of events.
+
+    """
+    dfg_parameters = DirectlyFollowsGraphParameters(
+        case_id_key,
+        activity_key,
+        timestamp_key,
+        start_timestamp_key,
+        cost_key,
+        calculate_frequency,
+        calculate_time,
+        calculate_cost,
+        frequency_statistic,
+        time_statistic,
+        cost_statistic,
+        quantile_error=quantile_error,
+    )
+    log_batches = read_log_batches(
+        source,
+        case_id_key,
+        activity_key,
+        timestamp_key,
+        start_timestamp_key,
+        cost_key,
+        calculate_cost,
+        batch_size,
+        file_format,
+        timestamp_format,
+    )
+    dfg = DirectlyFollowsGraph(None, dfg_parameters)
+    dfg.build_from_batches(log_batches)
+    multi_perspective_dfg = dfg.get_graph()
+    start_activities = dfg.get_start_activities()
+    end_activities = dfg.get_end_activities()
+    return multi_perspective_dfg, start_activities, end_activities
+
+
 def filter_multi_perspective_dfg_activities(
     percentage: float,
     multi_perspective_dfg: dict,
@@ -129,6 +220,28 @@ def filter_multi_perspective_dfg_paths(
     return filtered_dfg
 
 
+def create_multi_perspective_dfg_filter(
+    multi_perspective_dfg: dict,
+    start_activities: dict,
+    end_activities: dict,
+) -> DirectlyFollowsGraphFilter:
+    """
+    Creates a reusable filter bound to a multi-perspective Directly-Follows Graph (DFG), to filter it with many percentages.
+
+    The order in which activities and paths are filtered is computed once per sorting, so every later call to its filter_activities and filter_paths methods is answered without searching the graph again. Both methods take the percentage, sort_by and ascending arguments of filter_multi_perspective_dfg_activities and filter_multi_perspective_dfg_paths and return the same filtered DFG.
+
+    Args:
+        multi_perspective_dfg (dict): A dictionary representing the multi-perspective DFG.
+        start_activities (dict): A dictionary containing the start activities of the DFG.
+        end_activities (dict): A dictionary containing the end activities of the DFG.
+
+    Returns:
+        DirectlyFollowsGraphFilter: The filter bound to the multi-perspective DFG.
+
+    """
+    return DirectlyFollowsGraphFilter(multi_perspective_dfg, start_activities, end_activities)
+
+
 def get_multi_perspective_dfg_string(
     multi_perspective_dfg: dict,
     start_activities: dict,
@@ -140,6 +253,8 @@ def get_multi_perspective_dfg_string(
     rankdir: str = "TD",
     diagram_tool: str = "graphviz",
     arc_thickness_by: Literal["frequency", "time"] = "frequency",
+    time_statistic: str | None = None,
+    cost_statistic: str | None = None,
 ):
     """
     Creates a string representation of a multi-perspective Directly-Follows Graph (DFG) diagram.
@@ -155,6 +270,8 @@ def get_multi_perspective_dfg_string(
         rankdir (str, optional): The direction of the graph layout. Defaults to "TD".
         diagram_tool (str, optional): The diagram_tool to use for building the diagram. Valid values are "graphviz" and "mermaid". Defaults to "graphviz".
         arc_thickness_by (str, optional): Controls arc thickness based on perspective. Valid values are "frequency", "time". Defaults to "frequency".
+        time_statistic (str | None, optional): The time statistic to display, among the ones the DFG was discovered with. Defaults to None, which displays the first one.
+        cost_statistic (str | None, optional): The cost statistic to display, among the ones the DFG was discovered with. Defaults to None, which displays the first one.
 
     Returns:
         str: The string representation of the multi-perspective DFG diagram.
@@ -175,6 +292,8 @@ def get_multi_perspective_dfg_string(
             cost_currency,
             rankdir,
             arc_thickness_by,
+            time_statistic,
+            cost_statistic,
         )
     else:
         diagrammer = MermaidDiagrammer(
@@ -186,6 +305,8 @@ def get_multi_perspective_dfg_string(
             visualize_cost,
             cost_currency,
             rankdir,
+            time_statistic,
+            cost_statistic,
         )
 
     diagrammer.build_diagram()
@@ -204,6 +325,8 @@ def view_multi_perspective_dfg(
     rankdir: str = "TD",
     format: str = "svg",
     arc_thickness_by: Literal["frequency", "time"] = "frequency",
+    time_statistic: str | None = None,
+    cost_statistic: str | None = None,
 ):
     """
     Visualizes a multi-perspective Directly-Follows Graph (DFG) using graphviz in interactive Python environments.
@@ -219,6 +342,8 @@ def view_multi_perspective_dfg(
         rankdir (str, optional): The direction of the graph layout. Defaults to "TD" (top-down).
         format (str, optional): The file format of the visualization output (e.g., "jpg", "png", "jpeg", "svg", "webp"). Defaults to "svg".
         arc_thickness_by (str, optional): Controls arc thickness based on perspective. Valid values are "frequency", "time". Defaults to "frequency".
+        time_statistic (str | None, optional): The time statistic to display, among the ones the DFG was discovered with. Defaults to None, which displays the first one.
+        cost_statistic (str | None, optional): The cost statistic to display, among the ones the DFG was discovered with. Defaults to None, which displays the first one.
 
     Raises:
         IOError: if the temporary file cannot be created or read.
@@ -240,6 +365,8 @@ def view_multi_perspective_dfg(
         cost_currency=cost_currency,
         rankdir=rankdir,
         arc_thickness_by=arc_thickness_by,
+        time_statistic=time_statistic,
+        cost_statistic=cost_statistic,
     )
 
     view_graphviz_diagram(dfg_string, format=format)
@@ -259,6 +386,8 @@ def save_vis_multi_perspective_dfg(
     diagram_tool: str = "graphviz",
     renderer: str | None = None,
     arc_thickness_by: Literal["frequency", "time"] = "frequency",
+    time_statistic: str | None = None,
+    cost_statistic: str | None = None,
 ):
     """
     Save a visual representation of a multi-perspective Directly-Follows Graph (DFG) to a file.
@@ -278,6 +407,8 @@ def save_vis_multi_perspective_dfg(
         diagram_tool (str | "graphviz" | "mermaid", optional): The diagram tool to use for building the diagram. Defaults to "graphviz".
         renderer (str, optional): The renderer to use for the graphviz diagram. Options are "cairo", "dot", "gd". Defaults to None.
         arc_thickness_by (str, optional): Controls arc thickness based on perspective. Valid values are "frequency", "time". Defaults to "frequency".
+        time_statistic (str | None, optional): The time statistic to display, among the ones the DFG was discovered with. Defaults to None, which displays the first one.
+        cost_statistic (str | None, optional): The cost statistic to display, among the ones the DFG was discovered with. Defaults to None, which displays the first one.
 
     Note:
         Mermaid diagrammer only supports saving the DFG diagram as a HTML file. It does not support viewing the diagram in interactive Python environments like Jupyter Notebooks and Google Colabs. Also the user needs internet connection to properly show the diagram in the HTML.
@@ -294,6 +425,8 @@ def save_vis_multi_perspective_dfg(
         rankdir=rankdir,
         diagram_tool=diagram_tool,
         arc_thickness_by=arc_thickness_by,
+        time_statistic=time_statistic,
+        cost_statistic=cost_statistic,
     )
     if diagram_tool == "graphviz":
         save_graphviz_diagram(dfg_string, file_name, format, renderer)
@@ -1,6 +1,7 @@
 import pandas as pd
 from mpvis.mpdfg.dfg_parameters import DirectlyFollowsGraphParameters
 from mpvis.mpdfg.dfg_builder import DirectlyFollowsGraphBuilder
+from mpvis.mpdfg.dfg_partial import PartialDirectlyFollowsGraph
 
 
 class DirectlyFollowsGraph:
@@ -11,12 +12,46 @@ class DirectlyFollowsGraph:
         self.end_activities = {}
         self.activities = {}
         self.connections = {}
+        self.statistics = {}
+        self.state_builder = None
+        self.built_rowwise = False
 
     def build(self):
-        DirectlyFollowsGraphBuilder(self, self.log, self.parameters).start()
+        if self.parameters.engine == "rowwise":
+            DirectlyFollowsGraphBuilder(self, self.log, self.parameters).start()
+            self.built_rowwise = True
+        else:
+            self.update(self.log)
+
+    def build_from_batches(self, batches):
+        self.update_from_batches(batches)
+
+    def update(self, events: pd.DataFrame):
+        """
+        Folds new events into the graph without rebuilding it. Every case keeps its last activity
+        and end timestamp, so events continuing a known case add the connection from its previous
+        activity and move its end activity. New events are expected to start after the events
+        already in the graph.
+        """
+        self.update_from_batches([events])
+
+    def update_from_batches(self, batches):
+        if self.state_builder is None:
+            self.state_builder = DirectlyFollowsGraphBuilder(
+                PartialDirectlyFollowsGraph(), None, self.parameters
+            )
+            # The row-wise engine keeps no incremental state, so a graph it built is seeded
+            # with its log before the new events are folded in.
+            if self.built_rowwise:
+                batches = [self.log, *batches]
+        self.state_builder.update_graph_with_batches(batches)
+        self.state_builder.get_graph_from_state(self)
 
     def get_graph(self):
-        return {"activities": self.activities, "connections": self.connections}
+        graph = {"activities": self.activities, "connections": self.connections}
+        if self.statistics:
+            graph["statistics"] = self.statistics
+        return graph
 
     def get_start_activities(self):
         return self.start_activities
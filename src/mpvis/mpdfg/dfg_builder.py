@@ -1,7 +1,16 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import compress
+
+import numpy as np
+import pandas as pd
+
+from mpvis.mpdfg.dfg_partial import PartialDirectlyFollowsGraph
 from mpvis.mpdfg.utils.builder import (
     new_activity_dict,
     new_connection_dict,
-    statistics_functions,
+    statistic_function,
     statistics_names_mapping,
 )
 
@@ -11,6 +20,7 @@ class DirectlyFollowsGraphBuilder:
         self.dfg = dfg
         self.log = log
         self.parameters = parameters
+        self.cases_state = {}
 
     def start(self):
         sorting_order = [self.parameters.start_timestamp_key, self.parameters.timestamp_key]
@@ -26,6 +36,200 @@ class DirectlyFollowsGraphBuilder:
             self.update_graph(group_data)
         self.compute_graph_dimensions_statistics()
 
+    def update_graph_with_batches(self, batches):
+        """
+        Folds an iterable of log batches into the graph state. Events are expected to arrive
+        ordered by start timestamp across batches, and each case keeps its last activity and end
+        timestamp between batches so that cases spanning a batch boundary are stitched together.
+        """
+        for batch in batches:
+            self.update_graph_with_batch(batch)
+
+    def update_graph_with_batch(self, batch):
+        sorting_order = [self.parameters.start_timestamp_key, self.parameters.timestamp_key]
+        sorted_batch = batch.sort_values(by=sorting_order, kind="stable")
+        events, case_codes = self.group_events_by_case(sorted_batch)
+        if events.empty:
+            return
+        if self.parameters.n_jobs != 1:
+            self.update_graph_in_parallel(events, case_codes)
+        else:
+            activity_codes, activity_names = pd.factorize(
+                events[self.parameters.activity_key], use_na_sentinel=False
+            )
+            self.update_activities_vectorized(events, activity_codes, activity_names)
+            self.update_connections_vectorized(events, case_codes, activity_codes, activity_names)
+
+        is_case_start = np.r_[True, case_codes[1:] != case_codes[:-1]]
+        is_case_end = np.r_[case_codes[1:] != case_codes[:-1], True]
+        self.update_connections_across_batches(events[is_case_start])
+        self.update_cases_state(events[is_case_end])
+
+    def update_graph_in_parallel(self, events, case_codes):
+        """
+        Splits the cases of the batch into partitions by hashing their ids, discovers a partial
+        graph for each partition in its own process and merges the partial graphs.
+        """
+        events = events[self.needed_columns()]
+        events_positions = np.arange(len(events))
+        n_jobs = self.parameters.n_jobs if self.parameters.n_jobs > 0 else os.cpu_count()
+        case_partitions = (
+            pd.util.hash_array(events[self.parameters.case_id_key].to_numpy()) % n_jobs
+        )
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            partial_graphs = [
+                executor.submit(
+                    discover_partial_dfg,
+                    events[in_partition],
+                    case_codes[in_partition],
+                    events_positions[in_partition],
+                    self.parameters,
+                )
+                for in_partition in (case_partitions == partition for partition in range(n_jobs))
+                if in_partition.any()
+            ]
+            partial_graph = reduce(
+                PartialDirectlyFollowsGraph.merge,
+                (partial.result() for partial in partial_graphs),
+                PartialDirectlyFollowsGraph(),
+            )
+
+        self.dfg.merge_elements(partial_graph)
+
+    def needed_columns(self):
+        columns = [
+            self.parameters.case_id_key,
+            self.parameters.activity_key,
+            self.parameters.timestamp_key,
+            self.parameters.start_timestamp_key,
+        ]
+        if self.parameters.calculate_cost:
+            columns.append(self.parameters.cost_key)
+        return columns
+
+    def create_partial_graph(self, case_codes, events_positions):
+        events = self.log
+        activity_codes, activity_names = pd.factorize(
+            events[self.parameters.activity_key], use_na_sentinel=False
+        )
+        self.update_activities_vectorized(events, activity_codes, activity_names)
+        connection_codes, connection_names = self.update_connections_vectorized(
+            events, case_codes, activity_codes, activity_names
+        )
+
+        _, first_activities = np.unique(activity_codes, return_index=True)
+        self.dfg.update_first_positions(
+            "activities", activity_names, events_positions[first_activities]
+        )
+        _, first_connections = np.unique(connection_codes, return_index=True)
+        connections_positions = events_positions[1:][case_codes[1:] == case_codes[:-1]]
+        self.dfg.update_first_positions(
+            "connections", connection_names, connections_positions[first_connections]
+        )
+
+        is_case_start = np.r_[True, case_codes[1:] != case_codes[:-1]]
+        is_case_end = np.r_[case_codes[1:] != case_codes[:-1], True]
+        for elements_key, in_elements in [
+            ("start_activities", is_case_start),
+            ("end_activities", is_case_end),
+        ]:
+            codes, names = pd.factorize(events[self.parameters.activity_key].to_numpy()[in_elements])
+            _, first_elements = np.unique(codes, return_index=True)
+            self.dfg.update_counts(
+                elements_key,
+                names,
+                np.bincount(codes, minlength=len(names)),
+                events_positions[in_elements][first_elements],
+            )
+
+    def update_connections_across_batches(self, first_events):
+        case_ids = first_events[self.parameters.case_id_key].tolist()
+        continued_cases = np.fromiter(
+            (case_id in self.cases_state for case_id in case_ids), dtype=bool, count=len(case_ids)
+        )
+        self.update_start_activities(first_events[~continued_cases])
+        if not continued_cases.any():
+            return
+
+        previous_activities, previous_timestamps = zip(
+            *(self.cases_state[case_id] for case_id in compress(case_ids, continued_cases))
+        )
+        continued_events = first_events[continued_cases]
+        connection_codes, connection_names = pd.MultiIndex.from_arrays(
+            [
+                np.asarray(previous_activities, dtype=object),
+                continued_events[self.parameters.activity_key].to_numpy(),
+            ]
+        ).factorize()
+
+        connections_data = {}
+        if self.parameters.calculate_time:
+            times_between_activities = (
+                continued_events[self.parameters.start_timestamp_key].array
+                - pd.DatetimeIndex(previous_timestamps).array
+            )
+            connections_data["time"] = (
+                pd.TimedeltaIndex(times_between_activities).total_seconds().to_numpy()
+            )
+
+        self.update_dimensions_data(
+            self.dfg.connections,
+            list(connection_names),
+            connection_codes,
+            connections_data,
+            new_connection_dict,
+        )
+
+    def update_start_activities(self, first_events):
+        for activity, frequency in first_events[self.parameters.activity_key].value_counts().items():
+            self.dfg.start_activities[activity] = (
+                self.dfg.start_activities.get(activity, 0) + frequency
+            )
+
+    def update_cases_state(self, last_events):
+        """
+        Keeps the last activity and end timestamp of every case, updating the state in place.
+        Cases seen again are moved to the end, so the state stays ordered by last update.
+        """
+        case_ids = last_events[self.parameters.case_id_key].tolist()
+        if self.cases_state:
+            for case_id in case_ids:
+                self.cases_state.pop(case_id, None)
+        self.cases_state.update(
+            zip(
+                case_ids,
+                zip(
+                    last_events[self.parameters.activity_key].tolist(),
+                    last_events[self.parameters.timestamp_key].array.tolist(),
+                ),
+            )
+        )
+
+    def get_graph_from_state(self, dfg):
+        """
+        Writes the statistics of the accumulated graph state into `dfg`, leaving the state
+        untouched so that more events can be folded in later.
+        """
+        dfg.activities = {
+            activity: dict(dimensions) for activity, dimensions in self.dfg.activities.items()
+        }
+        dfg.connections = {
+            connection: dict(dimensions) for connection, dimensions in self.dfg.connections.items()
+        }
+        dfg.start_activities = dict(
+            pd.Series(self.dfg.start_activities, dtype="int64").sort_values(
+                ascending=False, kind="stable"
+            )
+        )
+        dfg.end_activities = dict(
+            pd.Series(
+                [activity for activity, _ in self.cases_state.values()], dtype=object
+            ).value_counts()
+        )
+        dfg.statistics = {}
+        DirectlyFollowsGraphBuilder(dfg, None, self.parameters).compute_graph_dimensions_statistics()
+
     def get_start_and_end_activities(self, grouped_cases_by_id):
         self.dfg.start_activities = dict(
             grouped_cases_by_id[self.parameters.activity_key].first().value_counts()
@@ -60,9 +264,9 @@ class DirectlyFollowsGraphBuilder:
         if self.parameters.calculate_frequency:
             activity["frequency"] += 1
         if self.parameters.calculate_time:
-            activity["time"].append(time.total_seconds())
+            activity["time"].update(time.total_seconds())
         if self.parameters.calculate_cost:
-            activity["cost"].append(cost)
+            activity["cost"].update(cost)
 
     def update_connections(self, prev_activity, actual_activity):
         if prev_activity is None:
@@ -83,12 +287,105 @@ class DirectlyFollowsGraphBuilder:
         if self.parameters.calculate_frequency:
             connection["frequency"] += 1
         if self.parameters.calculate_time:
-            connection["time"].append(time_between_activities.total_seconds())
+            connection["time"].update(time_between_activities.total_seconds())
+
+    def group_events_by_case(self, sorted_log):
+        """
+        Reorders the sorted log so the events of every case are contiguous, visiting the cases in
+        the same order as the row-wise engine does.
+        """
+        sorted_log = sorted_log[sorted_log[self.parameters.case_id_key].notna()]
+        case_codes, _ = pd.factorize(sorted_log[self.parameters.case_id_key])
+        events_order = np.argsort(case_codes, kind="stable")
+        return sorted_log.iloc[events_order], case_codes[events_order]
+
+    def update_activities_vectorized(self, events, activity_codes, activity_names):
+        activities_data = {}
+        if self.parameters.calculate_time:
+            service_times = (
+                events[self.parameters.timestamp_key] - events[self.parameters.start_timestamp_key]
+            )
+            activities_data["time"] = service_times.dt.total_seconds().to_numpy()
+        if self.parameters.calculate_cost:
+            activities_data["cost"] = events[self.parameters.cost_key].to_numpy()
+
+        self.update_dimensions_data(
+            self.dfg.activities, activity_names, activity_codes, activities_data, new_activity_dict
+        )
+
+    def update_connections_vectorized(self, events, case_codes, activity_codes, activity_names):
+        same_case = case_codes[1:] == case_codes[:-1]
+        activities_count = len(activity_names)
+        connection_codes, connection_keys = pd.factorize(
+            activity_codes[:-1][same_case] * activities_count + activity_codes[1:][same_case]
+        )
+        connection_names = [
+            (activity_names[key // activities_count], activity_names[key % activities_count])
+            for key in connection_keys
+        ]
+
+        connections_data = {}
+        if self.parameters.calculate_time:
+            start_timestamps = events[self.parameters.start_timestamp_key].array
+            end_timestamps = events[self.parameters.timestamp_key].array
+            times_between_activities = (start_timestamps[1:] - end_timestamps[:-1])[same_case]
+            connections_data["time"] = (
+                pd.TimedeltaIndex(times_between_activities).total_seconds().to_numpy()
+            )
+
+        self.update_dimensions_data(
+            self.dfg.connections,
+            connection_names,
+            connection_codes,
+            connections_data,
+            new_connection_dict,
+        )
+        return connection_codes, connection_names
+
+    def update_dimensions_data(self, graph_elements, names, codes, dimensions_data, new_dict):
+        frequencies = np.bincount(codes, minlength=len(names))
+        elements_order = np.argsort(codes, kind="stable")
+        split_indices = np.cumsum(frequencies)[:-1]
+        grouped_dimensions_data = {
+            dimension: np.split(data[elements_order], split_indices)
+            for dimension, data in dimensions_data.items()
+        }
+
+        for code, name in enumerate(names):
+            element = graph_elements.setdefault(name, new_dict(self.parameters))
+            if self.parameters.calculate_frequency:
+                element["frequency"] += int(frequencies[code])
+            for dimension, grouped_data in grouped_dimensions_data.items():
+                element[dimension].update_batch(grouped_data[code])
 
     def compute_graph_dimensions_statistics(self):
+        if self.parameters.multiple_statistics:
+            self.compute_multiple_statistics()
         self.compute_activities_statistics()
         self.compute_connections_statistics()
 
+    def compute_multiple_statistics(self):
+        self.dfg.statistics = {
+            "activities": {
+                activity: self.dimensions_multiple_statistics(dimensions)
+                for activity, dimensions in self.dfg.activities.items()
+            },
+            "connections": {
+                connection: self.dimensions_multiple_statistics(dimensions)
+                for connection, dimensions in self.dfg.connections.items()
+            },
+        }
+
+    def dimensions_multiple_statistics(self, dimensions):
+        return {
+            dimension: {
+                statistic: self.statistic_function_handler(dimensions[dimension], statistic)
+                for statistic in getattr(self.parameters, f"{dimension}_statistics")
+            }
+            for dimension in ["time", "cost"]
+            if dimension in dimensions
+        }
+
     def compute_activities_statistics(self):
         statistics_mapping = statistics_names_mapping(self.parameters)
         for activity, dimensions in self.dfg.activities.items():
@@ -111,11 +408,23 @@ class DirectlyFollowsGraphBuilder:
         value = None
         if dimension_statistic in ["absolute-case", "relative-case"]:
             total_cases = sum(self.dfg.start_activities.values())
-            value = statistics_functions[dimension_statistic](data, total_cases)
+            value = statistic_function(dimension_statistic)(data, total_cases)
         elif dimension_statistic == "relative-activity":
             total_activities = sum(d["frequency"] for d in self.dfg.activities.values())
-            value = statistics_functions[dimension_statistic](data, total_activities)
+            value = statistic_function(dimension_statistic)(data, total_activities)
         else:
-            value = statistics_functions[dimension_statistic](data)
+            value = statistic_function(dimension_statistic)(data)
 
         return max(value, 0)
+
+
+def discover_partial_dfg(events, case_codes, events_positions, parameters):
+    """
+    Discovers the partial graph of a partition of cases. The events of every case must be
+    contiguous and `events_positions` holds the position of each event in the whole log.
+    """
+    partial_graph = PartialDirectlyFollowsGraph()
+    DirectlyFollowsGraphBuilder(partial_graph, events, parameters).create_partial_graph(
+        case_codes, events_positions
+    )
+    return partial_graph
@@ -0,0 +1,47 @@
+from mpvis.mpdfg.utils.filters import (
+    activities_filter_order,
+    activities_to_filter_count,
+    filtered_activities_dfg,
+    filtered_paths_dfg,
+    paths_filter_order,
+)
+
+
+class DirectlyFollowsGraphFilter:
+    """
+    Activity and path filters bound to a multi-perspective DFG.
+
+    The first time a sorting is used, the order in which activities and paths are filtered is
+    computed once and kept, so every percentage after that is answered by slicing those orders
+    instead of searching the graph again.
+    """
+
+    def __init__(self, dfg: dict, start_activities: dict, end_activities: dict):
+        self.dfg = dfg
+        self.start_activities = start_activities
+        self.end_activities = end_activities
+        self.activities_orders = {}
+        self.paths_orders = {}
+
+    def filter_activities(
+        self, percentage: float, sort_by: str = "frequency", ascending: bool = True
+    ) -> dict:
+        if (sort_by, ascending) not in self.activities_orders:
+            self.activities_orders[(sort_by, ascending)] = activities_filter_order(
+                self.dfg, self.start_activities, self.end_activities, sort_by, ascending
+            )
+        sorted_activities, filtered_activities = self.activities_orders[(sort_by, ascending)]
+        activities_to_filter = activities_to_filter_count(len(sorted_activities), percentage)
+        return filtered_activities_dfg(
+            self.dfg, sorted_activities, filtered_activities[: max(activities_to_filter, 0)]
+        )
+
+    def filter_paths(
+        self, percentage: float, sort_by: str = "frequency", ascending: bool = True
+    ) -> dict:
+        if (sort_by, ascending) not in self.paths_orders:
+            self.paths_orders[(sort_by, ascending)] = paths_filter_order(
+                self.dfg, self.start_activities, self.end_activities, sort_by, ascending
+            )
+        remaining_paths, filtered_paths = self.paths_orders[(sort_by, ascending)]
+        return filtered_paths_dfg(self.dfg, remaining_paths, filtered_paths, percentage)
@@ -1,5 +1,9 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
 
+from mpvis.mpdfg.utils.builder import is_valid_dimension_statistic
+
 
 @dataclass
 class DirectlyFollowsGraphParameters:
@@ -12,8 +16,11 @@ class DirectlyFollowsGraphParameters:
     calculate_time: bool = True
     calculate_cost: bool = True
     frequency_statistic: str = "absolute-activity"
-    time_statistic: str = "mean"
-    cost_statistic: str = "mean"
+    time_statistic: str | list[str] = "mean"
+    cost_statistic: str | list[str] = "mean"
+    engine: str = "vectorized"
+    quantile_error: float | None = None
+    n_jobs: int = 1
 
     def __post_init__(self):
         if self.frequency_statistic not in {
@@ -26,12 +33,24 @@ class DirectlyFollowsGraphParameters:
                 "Valid values for frequency statistic are absolute-activity, absolute-case, relative-activity and relative-case"
             )
 
-        if self.time_statistic not in {"mean", "median", "sum", "max", "min", "stdev"}:
-            raise ValueError(
-                "Valid values for time statistic are mean, median, sum, max, min and stdev"
-            )
+        self.multiple_statistics = not (
+            isinstance(self.time_statistic, str) and isinstance(self.cost_statistic, str)
+        )
+        for dimension in ["time", "cost"]:
+            statistics = getattr(self, f"{dimension}_statistic")
+            statistics = [statistics] if isinstance(statistics, str) else list(statistics)
+            if not statistics or not all(map(is_valid_dimension_statistic, statistics)):
+                raise ValueError(
+                    f"Valid values for {dimension} statistic are mean, median, sum, max, min, stdev and percentiles like p95, or a list of them"
+                )
+            setattr(self, f"{dimension}_statistics", statistics)
+            setattr(self, f"{dimension}_statistic", statistics[0])
 
-        if self.cost_statistic not in {"mean", "median", "sum", "max", "min", "stdev"}:
-            raise ValueError(
-                "Valid values for cost statistic are mean, median, sum, max, min and stdev"
-            )
+        if self.engine not in {"vectorized", "rowwise"}:
+            raise ValueError("Valid values for engine are vectorized and rowwise")
+
+        if self.quantile_error is not None and not 0 < self.quantile_error < 1:
+            raise ValueError("Quantile error must be None or a number between 0 and 1")
+
+        if self.n_jobs == 0 or self.n_jobs < -1:
+            raise ValueError("Number of jobs must be a positive number or -1 to use every core")
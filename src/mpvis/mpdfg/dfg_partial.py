@@ -0,0 +1,63 @@
+class PartialDirectlyFollowsGraph:
+    """
+    Serializable partial aggregate of a DFG built from a subset of the cases of a log.
+
+    Activities and connections hold their frequencies and statistic accumulators, and start and
+    end activities hold their case counts. Every element also keeps the position of its first
+    event in the whole log, so merged partials give the same ordering as a sequential build.
+    """
+
+    def __init__(self):
+        self.activities = {}
+        self.connections = {}
+        self.start_activities = {}
+        self.end_activities = {}
+        self.first_positions = {
+            "activities": {},
+            "connections": {},
+            "start_activities": {},
+            "end_activities": {},
+        }
+
+    def update_first_positions(self, elements_key, names, positions):
+        first_positions = self.first_positions[elements_key]
+        for name, position in zip(names, positions):
+            first_positions[name] = min(first_positions.get(name, position), position)
+
+    def update_counts(self, elements_key, names, counts, positions):
+        elements_counts = getattr(self, elements_key)
+        for name, count in zip(names, counts):
+            elements_counts[name] = elements_counts.get(name, 0) + int(count)
+        self.update_first_positions(elements_key, names, positions)
+
+    def merge(self, other: "PartialDirectlyFollowsGraph") -> "PartialDirectlyFollowsGraph":
+        self.merge_elements(other)
+        for elements_key in ["start_activities", "end_activities"]:
+            counts = getattr(self, elements_key)
+            for name, count in getattr(other, elements_key).items():
+                counts[name] = counts.get(name, 0) + count
+
+        for elements_key, first_positions in other.first_positions.items():
+            self.update_first_positions(
+                elements_key, first_positions.keys(), first_positions.values()
+            )
+        return self
+
+    def merge_elements(self, other: "PartialDirectlyFollowsGraph") -> None:
+        for elements_key in ["activities", "connections"]:
+            elements = getattr(self, elements_key)
+            for name, dimensions in other.ordered_elements(elements_key).items():
+                if name not in elements:
+                    elements[name] = dimensions
+                    continue
+                for dimension, data in dimensions.items():
+                    if dimension == "frequency":
+                        elements[name][dimension] += data
+                    else:
+                        elements[name][dimension].merge(data)
+
+    def ordered_elements(self, elements_key):
+        first_positions = self.first_positions[elements_key]
+        return dict(
+            sorted(getattr(self, elements_key).items(), key=lambda item: first_positions[item[0]])
+        )
@@ -15,6 +15,7 @@ from mpvis.mpdfg.utils.diagrammer import (
     format_time,
     ids_mapping,
     link_width,
+    select_dfg_statistics,
 )
 
 
@@ -30,8 +31,10 @@ class GraphVizDiagrammer:
         cost_currency: str = "USD",
         rankdir: str = "TB",
         arc_thickness_by: Literal["frequency", "time"] = "frequency",
+        time_statistic: str | None = None,
+        cost_statistic: str | None = None,
     ):
-        self.dfg = dfg
+        self.dfg = select_dfg_statistics(dfg, time_statistic, cost_statistic)
         self.start_activities = start_activities
         self.end_activities = end_activities
         self.visualize_frequency = visualize_frequency
@@ -4,6 +4,7 @@ from mpvis.mpdfg.utils.diagrammer import (
     format_time,
     ids_mapping,
     link_width,
+    select_dfg_statistics,
 )
 
 
@@ -18,8 +19,10 @@ class MermaidDiagrammer:
         visualize_cost: bool = True,
         cost_currency: str = "USD",
         rankdir: str = "TB",
+        time_statistic: str | None = None,
+        cost_statistic: str | None = None,
     ):
-        self.dfg = dfg
+        self.dfg = select_dfg_statistics(dfg, time_statistic, cost_statistic)
         self.start_activities = start_activities
         self.end_activities = end_activities
         self.visualize_frequency = visualize_frequency
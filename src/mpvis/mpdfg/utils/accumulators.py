@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from math import ceil, sqrt
+
+import numpy as np
+
+
+class StatisticAccumulator:
+    """
+    Constant-memory accumulator of the time or cost samples of a DFG activity or connection.
+
+    Count, sum, min and max are kept as running values and the mean and variance are updated with
+    Welford's algorithm. Samples are only stored when a quantile statistic is requested, either
+    exactly or summarized by a KLL sketch when a quantile error is given.
+    """
+
+    __slots__ = ("count", "total", "mean", "m2", "minimum", "maximum", "quantiles")
+
+    def __init__(self, track_quantiles: bool = False, quantile_error: float | None = None):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+        self.quantiles = None
+        if track_quantiles:
+            self.quantiles = (
+                ExactQuantiles()
+                if quantile_error is None
+                else QuantileSketch.from_error(quantile_error)
+            )
+
+    def update(self, value: float) -> None:
+        value = float(value)
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = float(np.minimum(self.minimum, value))
+        self.maximum = float(np.maximum(self.maximum, value))
+        if self.quantiles is not None:
+            self.quantiles.update(value)
+
+    def update_batch(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        batch_mean = float(np.mean(values))
+        self.combine(
+            len(values),
+            float(np.sum(values)),
+            batch_mean,
+            float(np.sum((values - batch_mean) ** 2)),
+            float(np.min(values)),
+            float(np.max(values)),
+        )
+        if self.quantiles is not None:
+            self.quantiles.update_batch(values)
+
+    def merge(self, other: StatisticAccumulator) -> None:
+        if other.count == 0:
+            return
+        self.combine(other.count, other.total, other.mean, other.m2, other.minimum, other.maximum)
+        if self.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+
+    def combine(self, count, total, mean, m2, minimum, maximum) -> None:
+        # Chan et al. parallel update of the Welford mean and sum of squared deviations.
+        combined_count = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / combined_count
+        self.m2 += m2 + delta * delta * self.count * count / combined_count
+        self.count = combined_count
+        self.total += total
+        # NaN samples propagate to the min and max, as they do with np.min and np.max.
+        self.minimum = float(np.minimum(self.minimum, minimum))
+        self.maximum = float(np.maximum(self.maximum, maximum))
+
+    def min(self) -> float:
+        return self.minimum if self.count else float("nan")
+
+    def max(self) -> float:
+        return self.maximum if self.count else float("nan")
+
+    def average(self) -> float:
+        return self.total / self.count
+
+    def stdev(self) -> float:
+        return sqrt(max(self.m2, 0.0) / self.count)
+
+    def quantile(self, q: float) -> float:
+        if self.quantiles is None:
+            raise ValueError("Quantiles were not tracked by this accumulator")
+        return self.quantiles.quantile(q)
+
+
+class ExactQuantiles:
+    """Keeps every sample to answer quantiles exactly, as `np.quantile` does."""
+
+    __slots__ = ("values",)
+
+    def __init__(self):
+        self.values = []
+
+    def update(self, value: float) -> None:
+        self.values.append(value)
+
+    def update_batch(self, values: np.ndarray) -> None:
+        self.values.extend(values.tolist())
+
+    def merge(self, other: ExactQuantiles) -> None:
+        self.values.extend(other.values)
+
+    def quantile(self, q: float) -> float:
+        return float(np.quantile(self.values, q))
+
+
+class QuantileSketch:
+    """
+    Mergeable KLL quantile sketch. Each level holds at most a geometrically decreasing number of
+    samples and, when full, promotes every other sorted sample to the next level with twice the
+    weight. The rank error is roughly 2 / k and memory is O(k) regardless of the sample count.
+    """
+
+    __slots__ = ("k", "levels", "offsets", "size")
+
+    def __init__(self, k: int = 200):
+        self.k = k
+        self.levels = [[]]
+        self.offsets = [0]
+        self.size = 0
+
+    @classmethod
+    def from_error(cls, error: float) -> QuantileSketch:
+        return cls(k=max(8, ceil(2 / error)))
+
+    def level_capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return ceil(self.k * (2 / 3) ** depth) + 1
+
+    def max_size(self) -> int:
+        return sum(self.level_capacity(level) for level in range(len(self.levels)))
+
+    def update(self, value: float) -> None:
+        self.levels[0].append(value)
+        self.size += 1
+        if self.size >= self.max_size():
+            self.compress()
+
+    def update_batch(self, values: np.ndarray) -> None:
+        self.levels[0].extend(values.tolist())
+        self.size += len(values)
+        self.compress()
+
+    def merge(self, other: QuantileSketch) -> None:
+        while len(self.levels) < len(other.levels):
+            self.add_level()
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.size += other.size
+        self.compress()
+
+    def add_level(self) -> None:
+        self.levels.append([])
+        self.offsets.append(0)
+
+    def compress(self) -> None:
+        while self.size >= self.max_size():
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) >= self.level_capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.add_level()
+                    self.compact_level(level)
+                    break
+
+    def compact_level(self, level: int) -> None:
+        # Alternating the kept half keeps the sketch deterministic without biasing the ranks.
+        items = sorted(self.levels[level])
+        leftover = [items.pop()] if len(items) % 2 else []
+        promoted = items[self.offsets[level] :: 2]
+        self.offsets[level] ^= 1
+        self.levels[level] = leftover
+        self.levels[level + 1].extend(promoted)
+        self.size -= len(items) - len(promoted)
+
+    def weighted_items(self) -> tuple[np.ndarray, np.ndarray]:
+        items = np.concatenate([np.asarray(items, dtype=float) for items in self.levels])
+        weights = np.concatenate(
+            [np.full(len(items), 2**level, dtype=float) for level, items in enumerate(self.levels)]
+        )
+        return items, weights
+
+    def quantile(self, q: float) -> float:
+        items, weights = self.weighted_items()
+        order = np.argsort(items, kind="stable")
+        cumulative_weights = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative_weights, q * cumulative_weights[-1], side="left")
+        return float(items[order][min(index, len(items) - 1)])
@@ -1,6 +1,11 @@
-import numpy as np
+import re
+from functools import partial
+
+from mpvis.mpdfg.utils.accumulators import StatisticAccumulator
 
 DECIMALS_TO_USE = 2
+DIMENSION_STATISTICS = {"mean", "median", "sum", "max", "min", "stdev"}
+PERCENTILE_STATISTIC_PATTERN = re.compile(r"p(100|\d{1,2}(\.\d+)?)")
 
 
 def statistics_names_mapping(dfg_params):
@@ -11,9 +16,29 @@ def statistics_names_mapping(dfg_params):
     }
 
 
+def quantile_level(statistic):
+    if statistic == "median":
+        return 0.5
+    match = PERCENTILE_STATISTIC_PATTERN.fullmatch(statistic)
+    return float(match.group(1)) / 100 if match else None
+
+
+def is_valid_dimension_statistic(statistic):
+    return statistic in DIMENSION_STATISTICS or quantile_level(statistic) is not None
+
+
+def new_statistic_accumulator(dfg_params, statistics):
+    return StatisticAccumulator(
+        track_quantiles=any(quantile_level(statistic) is not None for statistic in statistics),
+        quantile_error=dfg_params.quantile_error,
+    )
+
+
 def new_activity_dict(dfg_params):
     return {
-        key: [] if key != "frequency" else 0
+        key: new_statistic_accumulator(dfg_params, getattr(dfg_params, f"{key}_statistics"))
+        if key != "frequency"
+        else 0
         for key, value in {
             "frequency": dfg_params.calculate_frequency,
             "time": dfg_params.calculate_time,
@@ -25,7 +50,9 @@ def new_activity_dict(dfg_params):
 
 def new_connection_dict(dfg_params):
     return {
-        key: [] if key != "frequency" else 0
+        key: new_statistic_accumulator(dfg_params, dfg_params.time_statistics)
+        if key != "frequency"
+        else 0
         for key, value in {
             "frequency": dfg_params.calculate_frequency,
             "time": dfg_params.calculate_time,
@@ -52,28 +79,32 @@ def relative_case(activity_frequency, sum_of_cases):
     return round(relative_percentage, DECIMALS_TO_USE)
 
 
-def mean_val(data):
-    return round(np.mean(data), DECIMALS_TO_USE)
+def mean_val(accumulator):
+    return round(accumulator.average(), DECIMALS_TO_USE)
+
+
+def median_val(accumulator):
+    return round(accumulator.quantile(0.5), DECIMALS_TO_USE)
 
 
-def median_val(data):
-    return round(np.median(data), DECIMALS_TO_USE)
+def percentile_val(accumulator, level):
+    return round(accumulator.quantile(level), DECIMALS_TO_USE)
 
 
-def sum_val(data):
-    return round(np.sum(data), DECIMALS_TO_USE)
+def sum_val(accumulator):
+    return round(accumulator.total, DECIMALS_TO_USE)
 
 
-def max_val(data):
-    return round(np.max(data), DECIMALS_TO_USE)
+def max_val(accumulator):
+    return round(accumulator.max(), DECIMALS_TO_USE)
 
 
-def min_val(data):
-    return round(np.min(data), DECIMALS_TO_USE)
+def min_val(accumulator):
+    return round(accumulator.min(), DECIMALS_TO_USE)
 
 
-def stdev_val(data):
-    return round(np.std(data), DECIMALS_TO_USE)
+def stdev_val(accumulator):
+    return round(accumulator.stdev(), DECIMALS_TO_USE)
 
 
 statistics_functions = {
@@ -88,3 +119,9 @@ statistics_functions = {
     "min": min_val,
     "stdev": stdev_val,
 }
+
+
+def statistic_function(statistic):
+    if statistic in statistics_functions:
+        return statistics_functions[statistic]
+    return partial(percentile_val, level=quantile_level(statistic))
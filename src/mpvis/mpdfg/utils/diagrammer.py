@@ -7,6 +7,41 @@ from mpvis.mpdfg.utils.color_scales import (
 )
 
 
+def select_dfg_statistics(dfg, time_statistic=None, cost_statistic=None):
+    selected_statistics = {
+        dimension: statistic
+        for dimension, statistic in {"time": time_statistic, "cost": cost_statistic}.items()
+        if statistic is not None
+    }
+    if not selected_statistics:
+        return dfg
+    if "statistics" not in dfg:
+        raise ValueError(
+            "The DFG holds a single statistic per dimension. Discover it with a list of time or cost statistics to switch between them."
+        )
+
+    def select(elements, elements_statistics):
+        selected_elements = {}
+        for name, dimensions in elements.items():
+            selected_elements[name] = dimensions.copy()
+            for dimension, statistic in selected_statistics.items():
+                if dimension not in dimensions:
+                    continue
+                available_statistics = elements_statistics[name][dimension]
+                if statistic not in available_statistics:
+                    raise ValueError(
+                        f"The {dimension} statistic {statistic} was not discovered. Available statistics are {', '.join(available_statistics)}"
+                    )
+                selected_elements[name][dimension] = available_statistics[statistic]
+        return selected_elements
+
+    return {
+        **dfg,
+        "activities": select(dfg["activities"], dfg["statistics"]["activities"]),
+        "connections": select(dfg["connections"], dfg["statistics"]["connections"]),
+    }
+
+
 def dimensions_min_and_max(activities, connections) -> tuple[dict, dict]:
     activities_dimensions = next(iter(activities.values())).keys()
     connections_dimensions = next(iter(connections.values())).keys()
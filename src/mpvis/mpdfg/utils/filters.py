@@ -1,116 +1,112 @@
-import copy
-
-def try_to_reach(source, target, skip_path, paths, visited_already, sound_activities, followed_path):
-    followed_path.append(target)
-    if (source, target) == skip_path:
-        return False, followed_path
-    elif (source in sound_activities) or ((source, target) in paths):
-        return True, followed_path
-    else:
-        source_targets = [path[1] for path in paths if ((path[0] == source) and (path[1] not in visited_already))]
-        for source_target in source_targets:
-            visited_already.append(source_target)
-            reached, followed_path = try_to_reach(source_target, target, skip_path, paths, visited_already, sound_activities, followed_path)
-            if reached:
-                return True, followed_path
-
-    return False, followed_path
-
-def check_soundness(activity, skip_path, remaining_paths, start_activities, end_activities, sound_activities):
-    reached_source = False
-    for start_activity in start_activities:
-        followed_path_start = [start_activity]
-        if start_activity == activity:
-            reached_source = True
+from mpvis.mpdfg.utils.frozen_mapping import FrozenMapping
+
+def build_adjacency(paths):
+    successors = {}
+    predecessors = {}
+    for source, target in paths:
+        successors.setdefault(source, set()).add(target)
+        predecessors.setdefault(target, set()).add(source)
+    return successors, predecessors
+
+def reachable_activities(sources, adjacency, removed_activity):
+    reached = set(sources)
+    pending = list(reached)
+    while pending:
+        for neighbour in adjacency.get(pending.pop(), ()):
+            if neighbour != removed_activity and neighbour not in reached:
+                reached.add(neighbour)
+                pending.append(neighbour)
+    return reached
+
+def can_filter_activity(activity, activities, successors, predecessors, start_activities, end_activities):
+    # Removing the activity must not leave any of its neighbours without other paths.
+    for source in predecessors.get(activity, ()):
+        if len(successors[source]) <= 1:
+            return False
+    for target in successors.get(activity, ()):
+        if len(predecessors[target]) <= 1:
+            return False
+
+    remaining_activities = [remaining_activity for remaining_activity in activities if remaining_activity != activity]
+    if not remaining_activities:
+        return True
+
+    # Once an activity is sound every start activity leading to it counts as sound, so only the
+    # first remaining activity has to be reached from a start activity. Every remaining activity
+    # has to reach an end activity.
+    if not start_activities or not end_activities:
+        return False
+    if remaining_activities[0] not in reachable_activities(start_activities, successors, activity):
+        return False
+    reaching_end = reachable_activities(end_activities, predecessors, activity)
+    return all(remaining_activity in reaching_end for remaining_activity in remaining_activities)
+
+def remove_activity(activity, activities, paths, successors, predecessors):
+    del activities[activity]
+    for target in successors.pop(activity, set()):
+        del paths[(activity, target)]
+        predecessors[target].discard(activity)
+    for source in predecessors.pop(activity, set()):
+        paths.pop((source, activity), None)
+        successors[source].discard(activity)
+
+def filter_dfg_activity(activities, paths, successors, predecessors, start_activities, end_activities):
+    for activity in activities:
+        if (
+            activity not in start_activities
+            and activity not in end_activities
+            and can_filter_activity(activity, activities, successors, predecessors, start_activities, end_activities)
+        ):
+            remove_activity(activity, activities, paths, successors, predecessors)
+            return activity
+
+    return None
+
+def sorted_elements(elements, sort_by, ascending):
+    return sorted(elements, key = lambda element: elements[element][sort_by], reverse = not ascending)
+
+def activities_to_filter_count(activities_count, percentage):
+    return int(activities_count - round(activities_count * percentage / 100, 0))
+
+def activities_filter_order(dfg, start_activities, end_activities, sort_by = "frequency", ascending = True, activities_to_filter = None):
+    # Activities are removed greedily one at a time, so the removals for any percentage are a
+    # prefix of the removals made until no activity can be filtered.
+    sorted_activities = sorted_elements(dfg["activities"], sort_by, ascending)
+    remaining_activities = dict.fromkeys(sorted_activities)
+    remaining_paths = dict.fromkeys(dfg["connections"])
+    successors, predecessors = build_adjacency(remaining_paths)
+
+    filtered_activities = []
+    while activities_to_filter is None or len(filtered_activities) < activities_to_filter:
+        filtered_activity = filter_dfg_activity(remaining_activities, remaining_paths, successors, predecessors, start_activities, end_activities)
+        if filtered_activity is None:
             break
-        else:
-            reached_source, followed_path_start = try_to_reach(start_activity, activity, skip_path, remaining_paths, [], sound_activities, followed_path_start)
-            if reached_source:
-                break
-
-    if not reached_source:
-        return False, sound_activities
-
-    for end_activity in end_activities:
-        followed_path_end = [activity]
-        if end_activity == activity:
-            return True, list(set(sound_activities + followed_path_start + followed_path_end))
-        else:
-            reached_target, followed_path_end = try_to_reach(activity, end_activity, skip_path, remaining_paths, [], sound_activities, followed_path_end)
-            if reached_target:
-                return True, list(set(sound_activities + followed_path_start + followed_path_end))
-
-    return False, sound_activities
-
-def filter_dfg_activity(activities, paths, start_activities, end_activities):
-    for activity in activities.copy():
-        if activity not in start_activities and activity not in end_activities:
-            sources = []
-            targets = []
-            source_targets = {}
-            target_sources = {}
-
-            for path in paths:
-                if path[0] == activity:
-                    targets.append(path[1])
-                if path[1] == activity:
-                    sources.append(path[0])
-                if path[0] not in source_targets:
-                    source_targets[path[0]] = 0
-                source_targets[path[0]] += 1
-                if path[1] not in target_sources:
-                    target_sources[path[1]] = 0
-                target_sources[path[1]] += 1
-
-            can_filter = True
-            for source in sources:
-                if source_targets[source] <= 1:
-                    can_filter = False
-                    break
-            for target in targets:
-                if target_sources[target] <= 1:
-                    can_filter = False
-                    break
-
-            if can_filter:
-                remaining_activities = activities.copy()
-                del remaining_activities[activity]
-
-                remaining_paths = {path: values for path, values in paths.items() if ((path[0] != activity) and (path[1] != activity))}
-
-                sound_activities = []
-                for remaining_activity in remaining_activities:
-                    is_sound, sound_activities = check_soundness(remaining_activity, (activity, activity), remaining_paths, start_activities, end_activities, sound_activities)
-                    if is_sound:
-                        sound_activities.append(remaining_activity)
-                    else:
-                        can_filter = False
-                        break
-
-                if can_filter:
-                    return remaining_activities, remaining_paths, False
-
-    return activities, paths, True
+        filtered_activities.append(filtered_activity)
+
+    return sorted_activities, filtered_activities
+
+def filtered_dfg(dfg, activities, connections):
+    # Filtered DFGs are read-only views that share the activity and connection entries of the
+    # DFG they come from instead of copying them.
+    return {
+        key: FrozenMapping({activity: dfg["activities"][activity] for activity in activities}) if key == "activities"
+        else FrozenMapping({connection: dfg["connections"][connection] for connection in connections}) if key == "connections"
+        else FrozenMapping(value) if isinstance(value, dict)
+        else value
+        for key, value in dfg.items()
+    }
+
+def filtered_activities_dfg(dfg, sorted_activities, filtered_activities):
+    filtered_activities = set(filtered_activities)
+    activities = [activity for activity in sorted_activities if activity not in filtered_activities]
+    connections = [connection for connection in dfg["connections"] if connection[0] not in filtered_activities and connection[1] not in filtered_activities]
+    return filtered_dfg(dfg, activities, connections)
 
 def filter_dfg_activities(percentage, dfg, start_activities, end_activities, sort_by = "frequency", ascending = True):
-    dfg_copy = copy.deepcopy(dfg)
-    
-    remaining_activities = dict(sorted(dfg_copy["activities"].items(), key = lambda activity: activity[1][sort_by], reverse = not ascending))
-    remaining_paths = dfg_copy["connections"]
-
-    activities_to_filter = int(len(remaining_activities) - round(len(remaining_activities) * percentage / 100, 0))
-
-    end_reached = False
-    for i in range(activities_to_filter):
-        remaining_activities, remaining_paths, end_reached = filter_dfg_activity(remaining_activities, remaining_paths, start_activities, end_activities)
-
-        if end_reached:
-            break
+    activities_to_filter = activities_to_filter_count(len(dfg["activities"]), percentage)
+    sorted_activities, filtered_activities = activities_filter_order(dfg, start_activities, end_activities, sort_by, ascending, activities_to_filter)
 
-    dfg_copy["activities"] = remaining_activities
-    dfg_copy["connections"] = remaining_paths
-
-    return dfg_copy
+    return filtered_activities_dfg(dfg, sorted_activities, filtered_activities)
 
 def filter_dfg_cycles(dfg):
     filtered_paths = {}
@@ -124,57 +120,90 @@ def filter_dfg_cycles(dfg):
 
     return filtered_paths, remaining_paths
 
-def filter_dfg_path(filtered_paths, remaining_paths, start_activities, end_activities, checked_paths):
-    for path in remaining_paths.copy():
-        if path not in checked_paths:
-            checked_paths.append(path)
-            source_count = 0
-            target_count = 0
-      
-            for other_path in remaining_paths:
-                if path[0] == other_path[0]:
-                    source_count += 1
-                if path[1] == other_path[1]:
-                    target_count += 1
-                if source_count > 1 and target_count > 1:
-                    break
-      
-            if source_count > 1 and target_count > 1:
-                reached_source, sound_activities = check_soundness(path[0], path, remaining_paths, start_activities, end_activities, [])
-                reached_target, sound_activities = check_soundness(path[1], path, remaining_paths, start_activities, end_activities, sound_activities)
-
-                if reached_source and reached_target:
-                    filtered_paths[path] = remaining_paths[path]
-                    del remaining_paths[path]
-
-                    return filtered_paths, remaining_paths, False, checked_paths
-
-    return filtered_paths, remaining_paths, True, checked_paths
-
-def filter_dfg_paths(percentage, dfg, start_activities, end_activities, sort_by = "frequency", ascending = True):
-    dfg_copy = copy.deepcopy(dfg)
-    
-    filtered_paths, remaining_paths = filter_dfg_cycles(dfg_copy)
-
-    remaining_paths = dict(sorted(remaining_paths.items(), key = lambda path: path[1][sort_by], reverse = not ascending))
-
-    end_reached = False
-    checked_paths = []
-    while not end_reached:
-        filtered_paths, remaining_paths, end_reached, checked_paths = filter_dfg_path(filtered_paths, remaining_paths, start_activities, end_activities, checked_paths)
-
-    filtered_paths = dict(sorted(filtered_paths.items(), key = lambda path: path[1][sort_by], reverse = ascending))
+def first_reaching_activities(sources, adjacency):
+    # Labels every activity with the first source, in order, that reaches it, and keeps the
+    # neighbour it was reached from so that only removing one of those edges changes the labels.
+    labels = {}
+    parents = {}
+    for source in sources:
+        if source in labels:
+            continue
+        labels[source] = source
+        pending = [source]
+        while pending:
+            activity = pending.pop()
+            for neighbour in adjacency.get(activity, ()):
+                if neighbour not in labels:
+                    labels[neighbour] = source
+                    parents[neighbour] = activity
+                    pending.append(neighbour)
+    return labels, parents
+
+def can_filter_path(path, successors, start_labels, end_labels, start_activities, end_activities):
+    source, target = path
+    first_start = start_labels.get(source)
+    if first_start is None:
+        return False
+
+    first_end = end_labels.get(source)
+    if first_end == target:
+        reached = reachable_activities([source], successors, None)
+        first_end = next((end_activity for end_activity in end_activities if end_activity != target and end_activity in reached), None)
+    if first_end is None:
+        return False
+
+    # The source and the start and end activities used to reach it are sound from now on. The
+    # target has to be reached from a sound start activity other than the source, or through a
+    # path that does not go through the source.
+    if first_start == source and target not in start_activities:
+        other_start_activities = [start_activity for start_activity in start_activities if start_activity != source]
+        reached = reachable_activities(other_start_activities, successors, source)
+        if target not in reached and (first_end == source or first_end not in reached):
+            return False
+
+    if target in end_labels:
+        return True
+    reached = reachable_activities([target], successors, None)
+    return source in reached or first_start in reached
+
+def paths_filter_order(dfg, start_activities, end_activities, sort_by = "frequency", ascending = True):
+    # Which paths can be filtered does not depend on the percentage, only how many of them are
+    # shown again does.
+    filtered_paths, remaining_paths = filter_dfg_cycles(dfg)
+
+    remaining_paths = dict.fromkeys(sorted_elements(remaining_paths, sort_by, ascending))
+    successors, predecessors = build_adjacency(remaining_paths)
+
+    # Every path is checked once, in order, against the paths remaining at that moment.
+    start_labels = end_labels = None
+    for path in list(remaining_paths):
+        source, target = path
+        if len(successors[source]) <= 1 or len(predecessors[target]) <= 1:
+            continue
+        if start_labels is None:
+            start_labels, start_parents = first_reaching_activities(start_activities, successors)
+        if end_labels is None:
+            end_labels, end_parents = first_reaching_activities(end_activities, predecessors)
+        if can_filter_path(path, successors, start_labels, end_labels, start_activities, end_activities):
+            filtered_paths[path] = remaining_paths.pop(path)
+            successors[source].discard(target)
+            predecessors[target].discard(source)
+            if start_parents.get(target) == source:
+                start_labels = None
+            if end_parents.get(source) == target:
+                end_labels = None
+
+    filtered_paths = sorted_elements({path: dfg["connections"][path] for path in filtered_paths}, sort_by, not ascending)
+
+    return list(remaining_paths), filtered_paths
+
+def filtered_paths_dfg(dfg, remaining_paths, filtered_paths, percentage):
     paths_to_include = round(len(filtered_paths) * percentage / 100, 0)
+    included_paths = filtered_paths[:int(paths_to_include)] if paths_to_include > 0 else []
 
-    if paths_to_include > 0:
-        i = 0
-        for path, values in filtered_paths.items():
-            remaining_paths[path] = values
+    return filtered_dfg(dfg, dfg["activities"], remaining_paths + included_paths)
 
-            i += 1
-            if i >= paths_to_include:
-                break
-
-    dfg_copy["connections"] = remaining_paths
+def filter_dfg_paths(percentage, dfg, start_activities, end_activities, sort_by = "frequency", ascending = True):
+    remaining_paths, filtered_paths = paths_filter_order(dfg, start_activities, end_activities, sort_by, ascending)
 
-    return dfg_copy
\ No newline at end of file
+    return filtered_paths_dfg(dfg, remaining_paths, filtered_paths, percentage)
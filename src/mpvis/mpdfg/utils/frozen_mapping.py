@@ -0,0 +1,29 @@
+from collections.abc import Mapping
+
+
+class FrozenMapping(Mapping):
+    """
+    Read-only view over a mapping. Nested dictionaries are wrapped when they are accessed, so a
+    view can share the whole structure of the mapping it wraps without copying any of it.
+    """
+
+    __slots__ = ("mapping",)
+
+    def __init__(self, mapping: Mapping):
+        self.mapping = mapping
+
+    def __getitem__(self, key):
+        value = self.mapping[key]
+        return FrozenMapping(value) if isinstance(value, dict) else value
+
+    def __iter__(self):
+        return iter(self.mapping)
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def __repr__(self):
+        return f"FrozenMapping({self.mapping!r})"
+
+    def copy(self) -> dict:
+        return dict(self.items())
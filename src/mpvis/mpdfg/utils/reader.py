@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+CSV_SUFFIXES = {".csv", ".txt"}
+
+
+def infer_file_format(source) -> str:
+    path = Path(source[0] if isinstance(source, (list, tuple)) else source)
+    return "csv" if path.suffix.lower() in CSV_SUFFIXES else "parquet"
+
+
+def read_log_batches(
+    source,
+    case_id_key: str,
+    activity_key: str,
+    timestamp_key: str,
+    start_timestamp_key: str,
+    cost_key: str,
+    calculate_cost: bool,
+    batch_size: int,
+    file_format: str | None = None,
+    timestamp_format: str | None = None,
+):
+    """
+    Yields the event log stored in a Parquet or CSV file, directory or pyarrow dataset as pandas
+    DataFrames of at most `batch_size` events, reading only the columns the DFG needs and
+    formatting them as `log_formatter` does.
+    """
+    dataset = (
+        source
+        if isinstance(source, ds.Dataset)
+        else ds.dataset(source, format=file_format or infer_file_format(source))
+    )
+    available_columns = set(dataset.schema.names)
+    missing_columns = {case_id_key, activity_key, timestamp_key} - available_columns
+    if missing_columns:
+        raise ValueError(f"Columns {missing_columns} are not in the event log")
+
+    has_start_timestamp = start_timestamp_key in available_columns
+    has_cost = calculate_cost and cost_key in available_columns
+    columns = [case_id_key, activity_key, timestamp_key]
+    if has_start_timestamp:
+        columns.append(start_timestamp_key)
+    if has_cost:
+        columns.append(cost_key)
+
+    for record_batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+        batch = record_batch.to_pandas()
+        batch[case_id_key] = batch[case_id_key].astype(str)
+        batch[timestamp_key] = pd.to_datetime(
+            batch[timestamp_key], utc=True, format=timestamp_format
+        )
+        if has_start_timestamp:
+            batch[start_timestamp_key] = pd.to_datetime(
+                batch[start_timestamp_key], utc=True, format=timestamp_format
+            )
+        else:
+            batch[start_timestamp_key] = batch[timestamp_key].copy()
+        if calculate_cost and not has_cost:
+            batch[cost_key] = 0
+        yield batch
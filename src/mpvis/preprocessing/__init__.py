@@ -1,3 +1,11 @@
-from mpvis.preprocessing.log_variant_pruning import prune_log_based_on_top_variants
+from mpvis.preprocessing.log_variant_pruning import (
+    get_variants_table,
+    prune_log_based_on_top_variants,
+    prune_log_based_on_variants_coverage,
+    prune_log_based_on_variants_frequency,
+)
 
-from mpvis.preprocessing.manual_log_grouping import manual_log_grouping
+from mpvis.preprocessing.manual_log_grouping import (
+    batch_manual_log_grouping,
+    manual_log_grouping,
+)
@@ -1,18 +1,116 @@
-import pm4py
+from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import math
 
-if TYPE_CHECKING:
-    import pandas as pd
+import numpy as np
+import pandas as pd
+
+
+def calculate_variants(
+    log: pd.DataFrame,
+    activity_key: str = "concept:name",
+    timestamp_key: str = "time:timestamp",
+    case_id_key: str = "case:concept:name",
+) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Returns the variants table of the log and the variant id of every event of the log, which is
+    -1 for events without case id.
+
+    The variant of a case is its sequence of activities ordered by timestamp, keeping the log
+    order of events with the same timestamp. Every sequence is hashed once as the bytes of its
+    activity codes. Variants are ranked by frequency, with ties broken by sequence, both in
+    descending order, and the id of a variant is its rank. The coverage of a variant is the
+    share of cases of the log in its variant and in the variants ranked before it.
+    """
+    case_codes, case_ids = pd.factorize(log[case_id_key])
+    timestamp_order = (
+        log[timestamp_key].reset_index(drop=True).sort_values(kind="stable").index.to_numpy()
+    )
+    timestamp_order = timestamp_order[case_codes[timestamp_order] >= 0]
+    events_order = timestamp_order[np.argsort(case_codes[timestamp_order], kind="stable")]
+    cases_sizes = np.bincount(case_codes[events_order], minlength=len(case_ids))
+    offsets = np.concatenate(([0], np.cumsum(cases_sizes)))
+
+    activity_codes, activity_names = pd.factorize(
+        log[activity_key].to_numpy()[events_order], use_na_sentinel=False
+    )
+    cases_keys = [
+        activity_codes[start:end].tobytes()
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+    cases_variants, _ = pd.factorize(pd.Series(cases_keys, dtype=object))
+    frequencies = np.bincount(cases_variants)
+    first_cases = np.unique(cases_variants, return_index=True)[1]
+    activity_names = np.asarray(activity_names, dtype=object)
+    sequences = [
+        tuple(activity_names[activity_codes[offsets[case] : offsets[case + 1]]].tolist())
+        for case in first_cases.tolist()
+    ]
+
+    variants_order = sorted(
+        range(len(sequences)),
+        key=lambda variant: (frequencies[variant], sequences[variant]),
+        reverse=True,
+    )
+    variants_ranks = np.empty(len(sequences), dtype=np.int64)
+    variants_ranks[variants_order] = np.arange(len(sequences))
+    cases_ranks = variants_ranks[cases_variants]
+
+    ranked_case_ids = np.asarray(case_ids, dtype=object)[np.argsort(cases_ranks, kind="stable")]
+    ranked_frequencies = frequencies[variants_order]
+    variants_offsets = np.concatenate(([0], np.cumsum(ranked_frequencies))).tolist()
+    variants_table = pd.DataFrame(
+        {
+            "variant_id": np.arange(len(sequences)),
+            "sequence": [sequences[variant] for variant in variants_order],
+            "frequency": ranked_frequencies,
+            "coverage": np.cumsum(ranked_frequencies) / max(len(case_ids), 1),
+            "case_ids": [
+                ranked_case_ids[start:end].tolist()
+                for start, end in zip(variants_offsets[:-1], variants_offsets[1:])
+            ],
+        }
+    )
+    # Events without case id have code -1, which takes the extra last entry.
+    events_variants = np.append(cases_ranks, -1)[case_codes]
+    return variants_table, events_variants
+
+
+def get_variants_table(
+    log: pd.DataFrame,
+    activity_key: str = "concept:name",
+    timestamp_key: str = "time:timestamp",
+    case_id_key: str = "case:concept:name",
+) -> pd.DataFrame:
+    """
+    Computes the variants of the event log with their frequencies and cases.
+
+    A variant is a distinct sequence of activities of the cases of the event log, with the
+    activities of every case ordered by timestamp.
+
+    Args:
+        log (pd.DataFrame): The event log data, typically a DataFrame or similar structure.
+        activity_key (str, optional): The key for activity names in the event log. Defaults to "concept:name".
+        timestamp_key (str, optional): The key for timestamps in the event log. Defaults to "time:timestamp".
+        case_id_key (str, optional): The key for case IDs in the event log. Defaults to "case:concept:name".
+
+    Returns:
+        pd.DataFrame: One row per variant, from the most to the least frequent, with the variant id,
+        which is its position in this order, its sequence of activities as a tuple, its frequency,
+        its cumulative coverage, which is the share of cases covered by the variants up to it, and
+        the list of ids of its cases.
+    """
+    variants_table, _ = calculate_variants(log, activity_key, timestamp_key, case_id_key)
+    return variants_table
 
 
 def prune_log_based_on_top_variants(
-    log: 'pd.DataFrame',
+    log: pd.DataFrame,
     k: int,
-    activity_key="concept:name",
-    timestamp_key="time:timestamp",
-    case_id_key="case:concept:name",
-) -> 'pd.DataFrame':
+    activity_key: str = "concept:name",
+    timestamp_key: str = "time:timestamp",
+    case_id_key: str = "case:concept:name",
+) -> pd.DataFrame:
     """
     Prunes the event log to retain only the top k variants.
 
@@ -29,4 +127,76 @@ def prune_log_based_on_top_variants(
     Returns:
         pd.DataFrame: The pruned event log containing only the top k variants.
     """
-    return pm4py.filter_variants_top_k(log, k, activity_key, timestamp_key, case_id_key)
\ No newline at end of file
+    _, events_variants = calculate_variants(log, activity_key, timestamp_key, case_id_key)
+    return keep_top_variants(log, events_variants, k)
+
+
+def prune_log_based_on_variants_coverage(
+    log: pd.DataFrame,
+    coverage: float,
+    activity_key: str = "concept:name",
+    timestamp_key: str = "time:timestamp",
+    case_id_key: str = "case:concept:name",
+) -> pd.DataFrame:
+    """
+    Prunes the event log to retain the fewest top variants that cover a share of its cases.
+
+    Variants are taken from the most to the least frequent until they have at least `coverage`
+    of the cases of the event log. The `coverage` column of `get_variants_table` is the
+    cumulative coverage curve, which can be used to choose the coverage.
+
+    Args:
+        log (pd.DataFrame): The event log data to prune, typically a DataFrame or similar structure.
+        coverage (float): The share of cases to cover, between 0 and 1.
+        activity_key (str, optional): The key for activity names in the event log. Defaults to "concept:name".
+        timestamp_key (str, optional): The key for timestamps in the event log. Defaults to "time:timestamp".
+        case_id_key (str, optional): The key for case IDs in the event log. Defaults to "case:concept:name".
+
+    Returns:
+        pd.DataFrame: The pruned event log containing only the variants needed to reach the coverage.
+    """
+    if not 0 <= coverage <= 1:
+        error_message = "Coverage must be a number between 0 and 1."
+        raise ValueError(error_message)
+
+    variants_table, events_variants = calculate_variants(
+        log, activity_key, timestamp_key, case_id_key
+    )
+    frequencies = variants_table["frequency"].to_numpy()
+    cases_to_cover = math.ceil(round(coverage * frequencies.sum(), 9))
+    # A variant is needed when the variants ranked before it cover fewer cases.
+    cases_covered_before = np.cumsum(frequencies) - frequencies
+    k = np.count_nonzero(cases_covered_before < cases_to_cover)
+    return keep_top_variants(log, events_variants, k)
+
+
+def prune_log_based_on_variants_frequency(
+    log: pd.DataFrame,
+    min_frequency: int,
+    activity_key: str = "concept:name",
+    timestamp_key: str = "time:timestamp",
+    case_id_key: str = "case:concept:name",
+) -> pd.DataFrame:
+    """
+    Prunes the event log to retain only the variants with a minimum number of cases.
+
+    Args:
+        log (pd.DataFrame): The event log data to prune, typically a DataFrame or similar structure.
+        min_frequency (int): The minimum number of cases of the variants to retain.
+        activity_key (str, optional): The key for activity names in the event log. Defaults to "concept:name".
+        timestamp_key (str, optional): The key for timestamps in the event log. Defaults to "time:timestamp".
+        case_id_key (str, optional): The key for case IDs in the event log. Defaults to "case:concept:name".
+
+    Returns:
+        pd.DataFrame: The pruned event log containing only the variants with at least `min_frequency`
+        cases.
+    """
+    variants_table, events_variants = calculate_variants(
+        log, activity_key, timestamp_key, case_id_key
+    )
+    k = np.count_nonzero(variants_table["frequency"].to_numpy() >= min_frequency)
+    return keep_top_variants(log, events_variants, k)
+
+
+def keep_top_variants(log: pd.DataFrame, events_variants: np.ndarray, k: int) -> pd.DataFrame:
+    return log[(events_variants >= 0) & (events_variants < k)]
@@ -1,48 +1,49 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
-
-if TYPE_CHECKING:
-    from time import timedelta
 
 
 class ManualLogGrouping:
+    """
+    Groups the activities of one or more groupings, given as pairs of activities to group and
+    group name, in a single pass over the log. An activity listed in several groupings is
+    grouped by the first grouping that lists it.
+    """
+
     def __init__(
         self,
         log: pd.DataFrame,
-        activities_to_group: list[str],
-        group_name: str | None = None,
+        groupings: list[tuple[list[str], str | None]],
         case_id_key: str = "case:concept:name",
         activity_id_key: str = "concept:name",
         start_timestamp_key: str | None = "start_timestamp",
         timestamp_key: str = "time:timestamp",
     ) -> None:
-        self.log: pd.DataFrame = log.copy(deep=True)
-        self.activities_to_group: list[str] = activities_to_group
-        self.group_name: str = self.set_group_name(group_name, activities_to_group)
+        self.log: pd.DataFrame = log
+        self.groupings: list[tuple[list[str], str | None]] = groupings
+        self.groups_names: list[str] = [
+            self.set_group_name(group_name, activities_to_group)
+            for activities_to_group, group_name in groupings
+        ]
         self.case_id_key: str = case_id_key
         self.activity_id_key: str = activity_id_key
         self.start_timestamp_key: str | None = start_timestamp_key
         self.timestamp_key: str = timestamp_key
-        self.log_columns: pd.Index[str] = self.log.columns
-        self.activities_left_to_be_grouped: set[str] = activities_to_group.copy()
-        self.grouped_log: dict = {}
-        self.actual_activities_index: int = 0
-        self.actual_activities_grouping_index: int = 0
-        self.validate_activities_to_group()
+        self.grouped_log: pd.DataFrame | None = None
+        for activities_to_group, _ in groupings:
+            self.validate_activities_to_group(activities_to_group)
+        self.cast_categorical_columns_to_categories_type()
         self.cast_object_type_columns_to_string()
         self.group()
 
     def set_group_name(self, group_name: str | None, activities_to_group: list[str]) -> str:
         return group_name if group_name else "[" + ",<br/>".join(activities_to_group) + "]"
 
-    def validate_activities_to_group(self) -> None | ValueError:
+    def validate_activities_to_group(self, activities_to_group: list[str]) -> None | ValueError:
         unique_activities_names = set(self.log[self.activity_id_key].unique())
-        diff_between_sets = set(self.activities_to_group) - unique_activities_names
-        has_duplicated = len(self.activities_to_group) != len(set(self.activities_to_group))
+        diff_between_sets = set(activities_to_group) - unique_activities_names
+        has_duplicated = len(activities_to_group) != len(set(activities_to_group))
         if len(diff_between_sets) != 0:
             error_message = f"Activities to group: {diff_between_sets} are not in log activity names or activities to group is empty."
             raise ValueError(error_message)
@@ -50,117 +51,190 @@ class ManualLogGrouping:
             error_message = "Activities to group has duplicated elements. Keep only one occurrence of activity name."
             raise ValueError(error_message)
 
+    def cast_categorical_columns_to_categories_type(self) -> None:
+        """
+        Categorical columns are merged as their categories, so a column of string categories
+        is joined like any other string column.
+        """
+        categories_types = {
+            col: self.log[col].dtype.categories.dtype
+            for col in self.log.columns
+            if isinstance(self.log[col].dtype, pd.CategoricalDtype)
+        }
+        self.log = self.log.astype(categories_types)
+
     def cast_object_type_columns_to_string(self) -> None:
-        for col in self.log.columns:
-            if self.log[col].dtype == "object":
-                self.log[col] = self.log[col].astype(str)
+        object_columns = [col for col in self.log.columns if self.log[col].dtype == "object"]
+        self.log = self.log.astype(dict.fromkeys(object_columns, str))
 
     def group(self) -> None:
-        cases_grouped_by_id = self.log.groupby(self.case_id_key, dropna=False, sort=False)
-        print("Manual log grouping:")
-        for _, actual_case in tqdm(cases_grouped_by_id):
-            self.iterate_case_rows(actual_case)
-
-    def iterate_case_rows(self, df: pd.DataFrame) -> None:
-        for _, row in df.iterrows():
-            if self.is_activities_left_to_be_grouped_empty():
-                self.reset_activities_left_to_be_grouped()
-            if self.is_activity_in_activities_left_to_be_grouped(row):
-                self.group_activities(row)
-            else:
-                self.add_activity_to_log(row)
-
-        self.activities_left_to_be_grouped = self.activities_to_group.copy()
-
-    def group_activities(self, incoming_activity: pd.Series) -> None:
-        if self.is_activities_left_to_be_grouped_full():
-            self.actual_activities_grouping_index = self.actual_activities_index
-            self.add_activity_to_log(incoming_activity)
-        else:
-            base_activity = self.grouped_log[str(self.actual_activities_grouping_index)]
-            self.merge_activities(base_activity, incoming_activity)
-
-        self.activities_left_to_be_grouped.remove(incoming_activity[self.activity_id_key])
-
-    def add_activity_to_log(self, row: pd.Series) -> None:
-        self.grouped_log[str(self.actual_activities_index)] = row
-        self.actual_activities_index += 1
-
-    def merge_activities(self, base_activity: pd.Series, incoming_activity: pd.Series) -> pd.Series:
-        activity_data = []
-        for column_name in self.log_columns:
-            if column_name in [
-                self.case_id_key,
-                self.activity_id_key,
-                self.start_timestamp_key,
-                self.timestamp_key,
-            ]:
-                value = self.merge_value_based_on_column_name(
-                    column_name, base_activity, incoming_activity
-                )
-            else:
-                value = self.merge_value_based_on_data_type(
-                    column_name, base_activity, incoming_activity
-                )
-            activity_data.append(value)
-        merged_activities_data = pd.Series(activity_data, index=base_activity.index.tolist())
-        self.grouped_log[str(self.actual_activities_grouping_index)] = merged_activities_data
-
-    def is_activities_left_to_be_grouped_full(self) -> bool:
-        return len(self.activities_left_to_be_grouped) == len(self.activities_to_group)
-
-    def is_activities_left_to_be_grouped_empty(self) -> bool:
-        return len(self.activities_left_to_be_grouped) == 0
-
-    def is_activity_in_activities_left_to_be_grouped(self, row: pd.Series) -> bool:
-        return row[self.activity_id_key] in self.activities_left_to_be_grouped
-
-    def is_activity_in_activities_to_group(self, row: pd.Series) -> bool:
-        return row[self.activity_id_key] in self.activities_to_group
-
-    def reset_activities_left_to_be_grouped(self) -> None:
-        self.activities_left_to_be_grouped = self.activities_to_group.copy()
-
-    def merge_value_based_on_column_name(
-        self, column_name: str, base_activity: pd.Series, incoming_activity: pd.Series
-    ) -> int | timedelta:
+        """
+        Sorts the events by case, in order of first appearance, and merges the events of every
+        group instance with two or more activities into the row of its first event. The other
+        events, including the single event of an incomplete group instance, are kept as they are.
+        """
+        case_codes, _ = pd.factorize(self.log[self.case_id_key], use_na_sentinel=False)
+        events_order = np.argsort(case_codes, kind="stable")
+        log = self.log.take(events_order).reset_index(drop=True)
+
+        activities_groupings = {}
+        for grouping_index, (activities_to_group, _) in enumerate(self.groupings):
+            for code, activity in enumerate(activities_to_group):
+                activities_groupings.setdefault(activity, (grouping_index, code))
+        # Activities are looked up once per distinct name. The extra last entry is for missing
+        # activity names, which factorize codes as -1.
+        log_activities_codes, log_activities = pd.factorize(log[self.activity_id_key])
+        groupings_lookup = np.full(len(log_activities) + 1, -1, dtype=np.int64)
+        codes_lookup = np.zeros(len(log_activities) + 1, dtype=np.int64)
+        for index, activity in enumerate(log_activities):
+            if activity in activities_groupings:
+                groupings_lookup[index], codes_lookup[index] = activities_groupings[activity]
+        events_groupings = groupings_lookup[log_activities_codes]
+        activities_codes = codes_lookup[log_activities_codes]
+
+        instances = assign_group_instances(
+            case_codes[events_order],
+            events_groupings,
+            activities_codes,
+            [len(activities_to_group) for activities_to_group, _ in self.groupings],
+        )
+
+        instances_sizes = np.bincount(instances[instances >= 0])
+        is_merged = instances >= 0
+        is_merged[is_merged] = instances_sizes[instances[is_merged]] > 1
+        if not is_merged.any():
+            self.grouped_log = log
+            return
+
+        # The instances of different groupings can overlap, so the events are sorted by
+        # instance to put the events of every instance next to each other, in log order.
+        merged_positions = np.flatnonzero(is_merged)
+        merged_positions = merged_positions[np.argsort(instances[merged_positions], kind="stable")]
+        merged_instances = instances[merged_positions]
+        is_first = np.concatenate(([True], merged_instances[1:] != merged_instances[:-1]))
+        segments_starts = np.flatnonzero(is_first)
+        first_positions = merged_positions[segments_starts]
+        groups_names = np.array(self.groups_names, dtype=object)[events_groupings[first_positions]]
+
+        for column_index, column_name in enumerate(log.columns):
+            values = log[column_name].to_numpy()[merged_positions]
+            merged_values = self.merge_column(
+                column_name, log[column_name], values, segments_starts, groups_names
+            )
+            log.iloc[first_positions, column_index] = merged_values
+
+        is_kept = ~is_merged
+        is_kept[first_positions] = True
+        self.grouped_log = log[is_kept].reset_index(drop=True)
+
+    def merge_column(
+        self,
+        column_name: str,
+        column: pd.Series,
+        values: np.ndarray,
+        segments_starts: np.ndarray,
+        groups_names: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Merges the values of every group instance. `values` holds the values of the events of
+        the merged instances and every instance starts at one of `segments_starts`.
+        """
         if column_name == self.case_id_key:
-            return base_activity[self.case_id_key]
+            return values[segments_starts]
         if column_name == self.activity_id_key:
-            return self.group_name
+            return groups_names
         if column_name == self.start_timestamp_key:
-            return min(
-                base_activity[self.start_timestamp_key], incoming_activity[self.start_timestamp_key]
-            )
-        return max(base_activity[self.timestamp_key], incoming_activity[self.timestamp_key])
+            return np.minimum.reduceat(values, segments_starts)
+        if column_name == self.timestamp_key:
+            return np.maximum.reduceat(values, segments_starts)
+        return self.merge_values_based_on_data_type(column, values, segments_starts)
 
-    def merge_value_based_on_data_type(
-        self, column_name: str, base_activity: pd.Series, incoming_activity: pd.Series
-    ) -> float | int | str | timedelta:
-        base_value = base_activity[column_name]
-        incoming_value = incoming_activity[column_name]
+    def merge_values_based_on_data_type(
+        self, column: pd.Series, values: np.ndarray, segments_starts: np.ndarray
+    ) -> np.ndarray:
+        dtype = column.dtype
+        is_number = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        if is_number or pd.api.types.is_timedelta64_dtype(dtype):
+            return np.add.reduceat(values, segments_starts)
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return np.maximum.reduceat(values, segments_starts)
+        if pd.api.types.is_string_dtype(dtype):
+            return join_listed_strings(values, segments_starts)
+        error_message = f"Unsupported data type: {dtype}. Try convert it before manual grouping"
+        raise TypeError(error_message)
 
+    def get_grouped_log(self) -> pd.DataFrame:
+        return self.grouped_log
+
+
+def assign_group_instances(
+    case_codes: np.ndarray,
+    events_groupings: np.ndarray,
+    activities_codes: np.ndarray,
+    groupings_sizes: list[int],
+) -> np.ndarray:
+    """
+    Returns the group instance of every event, or -1 for events that are not grouped.
+
+    A group instance starts at the first event of an activity of a grouping in a case and takes
+    the first event of every activity of the grouping that follows, until it has all of them
+    or the case ends. Repeated activities of an open instance are not grouped. The instance of
+    an event depends on which activities the open instance of its grouping already has, so the
+    events to group are scanned once with a bit mask of those activities per grouping.
+    """
+    instances = np.full(len(case_codes), -1, dtype=np.int64)
+    grouped_positions = np.flatnonzero(events_groupings >= 0)
+    all_activities = [(1 << grouping_size) - 1 for grouping_size in groupings_sizes]
+
+    instance = -1
+    open_instances = [-1] * len(groupings_sizes)
+    open_instances_cases = [None] * len(groupings_sizes)
+    open_instances_activities = all_activities.copy()
+    for position, case_code, grouping, activity_code in zip(
+        grouped_positions.tolist(),
+        case_codes[grouped_positions].tolist(),
+        events_groupings[grouped_positions].tolist(),
+        activities_codes[grouped_positions].tolist(),
+    ):
+        activity = 1 << activity_code
         if (
-            pd.api.types.is_integer(base_value)
-            or pd.api.types.is_float(base_value)
-            or pd.api.types.is_complex(base_value)
+            case_code != open_instances_cases[grouping]
+            or open_instances_activities[grouping] == all_activities[grouping]
         ):
-            return base_value + incoming_value
-        if pd.api.types.is_string_dtype(type(base_value)):
-            if "[" in base_value or "]" in base_value:
-                return f"{base_value.replace(']', '')},{incoming_value}]"
-            return f"[{base_value},{incoming_value}]"
-        if pd.api.types.is_datetime64_any_dtype(type(base_value)):
-            return max(base_value, incoming_value)
-        if pd.api.types.is_timedelta64_dtype(type(base_value)):
-            return base_value + incoming_value
-        if pd.api.types.is_categorical_dtype(type(base_value)):
-            return f"{base_value}-{incoming_value}"
-        error_message = f"Unsupported data type: {type(base_value).__name__}. Try convert it before manual grouping"
-        raise TypeError(error_message)
+            instance += 1
+            open_instances[grouping] = instance
+            open_instances_cases[grouping] = case_code
+            open_instances_activities[grouping] = 0
+        elif open_instances_activities[grouping] & activity:
+            continue
+        open_instances_activities[grouping] |= activity
+        instances[position] = open_instances[grouping]
+    return instances
 
-    def get_grouped_log(self) -> pd.DataFrame:
-        return pd.DataFrame.from_dict(self.grouped_log, orient="index")
+
+def join_strings(values: np.ndarray, segments_starts: np.ndarray, separator: str) -> np.ndarray:
+    segments_ends = np.append(segments_starts[1:], len(values)) - 1
+    parts = np.char.add(values.astype(str), separator).astype(object)
+    parts[segments_ends] = values[segments_ends]
+    return np.add.reduceat(parts, segments_starts)
+
+
+def join_listed_strings(values: np.ndarray, segments_starts: np.ndarray) -> np.ndarray:
+    """
+    Joins the strings of every group instance as "[first,second,...]". Closing brackets of the
+    strings before the last one are removed, and the opening bracket is left out when the first
+    string already has a bracket.
+    """
+    strings = pd.Series(values, dtype=object).fillna("nan").astype(str)
+    segments_ends = np.append(segments_starts[1:], len(values)) - 1
+    parts = strings.str.replace("]", "", regex=False).to_numpy(dtype=object)
+    parts[segments_ends] = strings.to_numpy(dtype=object)[segments_ends]
+    first_strings = strings.iloc[segments_starts]
+    has_bracket = first_strings.str.contains("[", regex=False) | first_strings.str.contains(
+        "]", regex=False
+    )
+    prefixes = np.where(has_bracket.to_numpy(), "", "[").astype(object)
+    return prefixes + join_strings(parts, segments_starts, ",") + "]"
 
 
 def manual_log_grouping(
@@ -200,8 +274,52 @@ def manual_log_grouping(
     """
     manual_log_grouping = ManualLogGrouping(
         log,
-        activities_to_group,
-        group_name,
+        [(activities_to_group, group_name)],
+        case_id_key,
+        activity_id_key,
+        start_timestamp_key,
+        timestamp_key,
+    )
+    return manual_log_grouping.get_grouped_log()
+
+
+def batch_manual_log_grouping(
+    log: pd.DataFrame,
+    groupings: list[tuple[list[str], str | None]],
+    case_id_key: str = "case:concept:name",
+    activity_id_key: str = "concept:name",
+    start_timestamp_key: str | None = "start_timestamp",
+    timestamp_key: str = "time:timestamp",
+) -> pd.DataFrame:
+    """
+    Groups several sets of activities of a process log, each into its own activity group, in a
+    single pass over the log.
+
+    Every grouping is applied as `manual_log_grouping` would apply it. Groupings that share no
+    activities give the same log as grouping them one after another. An activity listed in
+    several groupings is grouped only by the first grouping that lists it.
+
+    Args:
+        log (pd.DataFrame): The input process log DataFrame containing the events.
+        groupings (list[tuple[list[str], str | None]]): Pairs of a list of activity names to group
+            together and the name of the node with the grouped activities, which can be None.
+        case_id_key (str, optional): The key in the DataFrame that represents the case ID.
+            Defaults to "case:concept:name".
+        activity_id_key (str, optional): The key in the DataFrame that represents the activity name.
+            Defaults to "concept:name".
+        start_timestamp_key (str | None, optional): The key in the DataFrame representing the start
+            timestamp of the events. Can be None if not available. Defaults to "start_timestamp".
+        timestamp_key (str, optional): The key in the DataFrame representing the event timestamp.
+            Defaults to "time:timestamp".
+
+    Returns:
+        pd.DataFrame: A new DataFrame with the grouped activities, keeping the original structure
+        of the log but modifying the activities of every grouping.
+
+    """
+    manual_log_grouping = ManualLogGrouping(
+        log,
+        groupings,
         case_id_key,
         activity_id_key,
         start_timestamp_key,
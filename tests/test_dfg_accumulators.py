@@ -0,0 +1,61 @@
+"""
+Tests for the constant-memory statistic accumulators used by the DFG builder.
+"""
+
+import numpy as np
+
+from mpvis.mpdfg.utils.accumulators import StatisticAccumulator
+
+
+def test_accumulator_matches_numpy_statistics():
+    values = np.random.default_rng(0).normal(50, 10, 5_000)
+
+    streamed = StatisticAccumulator(track_quantiles=True)
+    for value in values[:1_000]:
+        streamed.update(value)
+    streamed.update_batch(values[1_000:3_000])
+    partial = StatisticAccumulator(track_quantiles=True)
+    partial.update_batch(values[3_000:])
+    streamed.merge(partial)
+
+    assert streamed.count == len(values)
+    assert np.isclose(streamed.average(), np.mean(values))
+    assert np.isclose(streamed.total, np.sum(values))
+    assert np.isclose(streamed.stdev(), np.std(values))
+    assert streamed.minimum == np.min(values)
+    assert streamed.maximum == np.max(values)
+    assert streamed.quantile(0.5) == np.median(values)
+
+
+def test_quantile_sketch_keeps_bounded_memory_within_error():
+    values = np.random.default_rng(1).exponential(100, 200_000)
+    error = 0.01
+
+    accumulator = StatisticAccumulator(track_quantiles=True, quantile_error=error)
+    for chunk in np.array_split(values, 20):
+        accumulator.update_batch(chunk)
+
+    stored_samples = sum(len(level) for level in accumulator.quantiles.levels)
+    assert stored_samples < 2_000
+    for q in [0.5, 0.95]:
+        rank = np.mean(values <= accumulator.quantile(q))
+        assert abs(rank - q) <= error
+
+
+def test_accumulator_min_and_max_propagate_nan_costs():
+    values = np.array([3.0, np.nan, 1.0])
+
+    streamed = StatisticAccumulator()
+    for value in values:
+        streamed.update(value)
+    batched = StatisticAccumulator()
+    batched.update_batch(values[:1])
+    partial = StatisticAccumulator()
+    partial.update_batch(values[1:])
+    batched.merge(partial)
+
+    for accumulator in [streamed, batched]:
+        assert np.isnan(accumulator.min()) and np.isnan(np.min(values))
+        assert np.isnan(accumulator.max()) and np.isnan(np.max(values))
+    assert np.isnan(StatisticAccumulator().min())
+    assert np.isnan(StatisticAccumulator().max())
@@ -0,0 +1,165 @@
+"""
+Tests for the DFG discovery engines.
+
+The vectorized engine must produce exactly the same multi-perspective DFG, start activities
+and end activities as the row-wise engine it replaces.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import mpvis
+
+
+def build_event_log(n_cases=60, seed=7):
+    rng = np.random.default_rng(seed)
+    activities = ["Register", "Check", "Repair", "Test", "Close"]
+    base_time = pd.Timestamp("2024-01-01 08:00:00")
+    rows = []
+    for case in range(n_cases):
+        current_time = base_time + pd.Timedelta(minutes=int(rng.integers(0, 5000)))
+        for position in range(int(rng.integers(1, 8))):
+            activity = activities[0] if position == 0 else rng.choice(activities[1:])
+            start_time = current_time + pd.Timedelta(minutes=int(rng.integers(0, 20)))
+            end_time = start_time + pd.Timedelta(minutes=int(rng.integers(0, 40)))
+            rows.append(
+                {
+                    "case_id": f"C{case}",
+                    "activity": activity,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "cost": int(rng.integers(0, 50)),
+                }
+            )
+            current_time = end_time
+
+    event_log = pd.DataFrame(rows).sample(frac=1, random_state=seed)
+    event_log_format = {
+        "case:concept:name": "case_id",
+        "concept:name": "activity",
+        "time:timestamp": "end_time",
+        "start_timestamp": "start_time",
+        "org:resource": "",
+        "cost:total": "cost",
+    }
+    return mpvis.log_formatter(event_log, event_log_format)
+
+
+def test_vectorized_engine_matches_rowwise_engine():
+    """
+    Test that both engines build the same graph, including the insertion order of the
+    activities and connections, which drives the diagram node ids.
+    """
+    formatted_log = build_event_log()
+
+    for statistics in [
+        {},
+        {"frequency_statistic": "relative-case", "time_statistic": "median"},
+        {"calculate_cost": False, "time_statistic": "stdev"},
+    ]:
+        rowwise = mpvis.mpdfg.discover_multi_perspective_dfg(
+            formatted_log, engine="rowwise", **statistics
+        )
+        vectorized = mpvis.mpdfg.discover_multi_perspective_dfg(
+            formatted_log, engine="vectorized", **statistics
+        )
+
+        assert vectorized == rowwise
+        assert list(vectorized[0]["activities"]) == list(rowwise[0]["activities"])
+        assert list(vectorized[0]["connections"]) == list(rowwise[0]["connections"])
+
+
+def test_multiple_statistics_are_discovered_in_a_single_pass():
+    """
+    Test that a list of statistics keeps every value and that the diagram can switch to any of
+    them, matching a discovery made with that single statistic.
+    """
+    formatted_log = build_event_log()
+
+    multi_statistic_dfg, start_activities, end_activities = (
+        mpvis.mpdfg.discover_multi_perspective_dfg(
+            formatted_log, time_statistic=["mean", "median", "p95", "max"], cost_statistic=["sum"]
+        )
+    )
+    median_dfg, _, _ = mpvis.mpdfg.discover_multi_perspective_dfg(
+        formatted_log, time_statistic="median", cost_statistic="sum"
+    )
+
+    activity_statistics = multi_statistic_dfg["statistics"]["activities"]["Register"]
+    assert list(activity_statistics["time"]) == ["mean", "median", "p95", "max"]
+    assert multi_statistic_dfg["activities"]["Register"]["time"] == activity_statistics["time"]["mean"]
+
+    assert mpvis.mpdfg.get_multi_perspective_dfg_string(
+        multi_statistic_dfg, start_activities, end_activities, time_statistic="median"
+    ) == mpvis.mpdfg.get_multi_perspective_dfg_string(
+        median_dfg, start_activities, end_activities
+    )
+
+
+def test_file_discovery_matches_in_memory_discovery(tmp_path):
+    """
+    Test that reading the log from Parquet and CSV files in small batches gives the same graph as
+    the in-memory discovery, even when cases span several batches.
+    """
+    formatted_log = build_event_log().sort_values("start_timestamp", kind="stable")
+    formatted_log.to_parquet(tmp_path / "log.parquet")
+    formatted_log.to_csv(tmp_path / "log.csv", index=False)
+
+    in_memory = mpvis.mpdfg.discover_multi_perspective_dfg(
+        formatted_log, time_statistic=["mean", "median"]
+    )
+    for file_name in ["log.parquet", "log.csv"]:
+        for batch_size in [10_000, 25]:
+            from_file = mpvis.mpdfg.discover_multi_perspective_dfg_from_file(
+                tmp_path / file_name, time_statistic=["mean", "median"], batch_size=batch_size
+            )
+            assert from_file == in_memory
+
+
+def test_parallel_discovery_matches_single_process_discovery():
+    """
+    Test that merging the partial graphs discovered in several processes gives the same graph,
+    including the insertion order of the activities, connections and start and end activities.
+    """
+    formatted_log = build_event_log()
+
+    single_process = mpvis.mpdfg.discover_multi_perspective_dfg(
+        formatted_log, time_statistic=["mean", "median", "stdev"]
+    )
+    parallel = mpvis.mpdfg.discover_multi_perspective_dfg(
+        formatted_log, time_statistic=["mean", "median", "stdev"], n_jobs=3
+    )
+
+    assert parallel == single_process
+    for parallel_elements, single_process_elements in [
+        (parallel[0]["activities"], single_process[0]["activities"]),
+        (parallel[0]["connections"], single_process[0]["connections"]),
+        (parallel[1], single_process[1]),
+        (parallel[2], single_process[2]),
+    ]:
+        assert list(parallel_elements) == list(single_process_elements)
+
+
+@pytest.mark.parametrize("engine", ["vectorized", "rowwise"])
+def test_incremental_updates_match_discovery_from_scratch(engine):
+    """
+    Test that folding newly arrived events into a built graph gives the same graph as
+    discovering it again from the whole log, whichever engine built the graph.
+    """
+    formatted_log = build_event_log().sort_values("start_timestamp", kind="stable")
+    parameters = mpvis.mpdfg.dfg_parameters.DirectlyFollowsGraphParameters(
+        time_statistic=["mean", "median", "max"], engine=engine
+    )
+
+    incremental_dfg = mpvis.mpdfg.dfg.DirectlyFollowsGraph(formatted_log.iloc[:150], parameters)
+    incremental_dfg.build()
+    for new_events in [formatted_log.iloc[150:160], formatted_log.iloc[160:]]:
+        incremental_dfg.update(new_events)
+
+    full_dfg = mpvis.mpdfg.dfg.DirectlyFollowsGraph(formatted_log, parameters)
+    full_dfg.build()
+
+    assert incremental_dfg.get_graph() == full_dfg.get_graph()
+    assert incremental_dfg.get_start_activities() == full_dfg.get_start_activities()
+    assert incremental_dfg.get_end_activities() == full_dfg.get_end_activities()
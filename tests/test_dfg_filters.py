@@ -0,0 +1,110 @@
+"""
+Tests for the activity and path filters of multi-perspective DFGs.
+"""
+
+import pickle
+
+import pytest
+
+import mpvis
+
+
+def build_dfg(connections, frequencies):
+    dfg = {
+        "activities": {activity: {"frequency": frequency} for activity, frequency in frequencies.items()},
+        "connections": {connection: {"frequency": 1} for connection in connections},
+    }
+    return dfg, {"A": 3}, {"D": 3}
+
+
+def test_activities_are_filtered_while_the_graph_stays_sound():
+    dfg, start_activities, end_activities = build_dfg(
+        [("A", "B"), ("B", "D"), ("A", "C"), ("C", "D"), ("A", "D")],
+        {"A": 3, "B": 1, "C": 2, "D": 3},
+    )
+
+    filtered_dfg = mpvis.mpdfg.filter_multi_perspective_dfg_activities(
+        50, dfg, start_activities, end_activities
+    )
+
+    assert list(filtered_dfg["activities"]) == ["A", "D"]
+    assert list(filtered_dfg["connections"]) == [("A", "D")]
+    assert list(dfg["activities"]) == ["A", "B", "C", "D"]
+
+
+def test_activities_keeping_the_only_path_to_an_end_are_not_filtered():
+    dfg, start_activities, end_activities = build_dfg(
+        [("A", "B"), ("B", "D"), ("A", "C"), ("C", "D")],
+        {"A": 3, "B": 1, "C": 2, "D": 3},
+    )
+
+    filtered_dfg = mpvis.mpdfg.filter_multi_perspective_dfg_activities(
+        50, dfg, start_activities, end_activities
+    )
+
+    assert list(filtered_dfg["activities"]) == ["C", "A", "D"]
+    assert list(filtered_dfg["connections"]) == [("A", "C"), ("C", "D")]
+
+
+def test_paths_are_filtered_while_the_graph_stays_sound():
+    connections = [("A", "B"), ("B", "D"), ("A", "C"), ("C", "D"), ("B", "C"), ("C", "C")]
+    dfg = {
+        "activities": {activity: {"frequency": 1} for activity in "ABCD"},
+        "connections": {
+            connection: {"frequency": frequency}
+            for frequency, connection in enumerate(connections, start=1)
+        },
+    }
+
+    expected_connections = {
+        0: [("A", "B"), ("B", "D"), ("A", "C"), ("C", "D")],
+        50: [("A", "B"), ("B", "D"), ("A", "C"), ("C", "D"), ("C", "C")],
+        100: [("A", "B"), ("B", "D"), ("A", "C"), ("C", "D"), ("C", "C"), ("B", "C")],
+    }
+    for percentage, connections in expected_connections.items():
+        filtered_dfg = mpvis.mpdfg.filter_multi_perspective_dfg_paths(
+            percentage, dfg, {"A": 3}, {"D": 3}
+        )
+        assert list(filtered_dfg["connections"]) == connections
+
+
+def test_filter_object_matches_the_filter_functions():
+    dfg, start_activities, end_activities = build_dfg(
+        [("A", "B"), ("B", "D"), ("A", "C"), ("C", "D"), ("A", "D"), ("B", "C"), ("C", "C")],
+        {"A": 3, "B": 1, "C": 2, "D": 3},
+    )
+    dfg_filter = mpvis.mpdfg.create_multi_perspective_dfg_filter(
+        dfg, start_activities, end_activities
+    )
+
+    for percentage in [0, 25, 50, 75, 100]:
+        for ascending in [True, False]:
+            assert dfg_filter.filter_activities(
+                percentage, ascending=ascending
+            ) == mpvis.mpdfg.filter_multi_perspective_dfg_activities(
+                percentage, dfg, start_activities, end_activities, ascending=ascending
+            )
+            assert dfg_filter.filter_paths(
+                percentage, ascending=ascending
+            ) == mpvis.mpdfg.filter_multi_perspective_dfg_paths(
+                percentage, dfg, start_activities, end_activities, ascending=ascending
+            )
+
+
+def test_filtered_dfg_is_a_read_only_view_of_the_original():
+    dfg, start_activities, end_activities = build_dfg(
+        [("A", "B"), ("B", "D"), ("A", "C"), ("C", "D"), ("A", "D")],
+        {"A": 3, "B": 1, "C": 2, "D": 3},
+    )
+
+    filtered_dfg = mpvis.mpdfg.filter_multi_perspective_dfg_paths(
+        0, dfg, start_activities, end_activities
+    )
+
+    assert filtered_dfg["activities"]["A"] == dfg["activities"]["A"]
+    with pytest.raises(TypeError):
+        filtered_dfg["activities"]["A"]["frequency"] = 0
+    assert pickle.loads(pickle.dumps(filtered_dfg)) == filtered_dfg
+
+    dfg["activities"]["A"]["frequency"] = 5
+    assert filtered_dfg["activities"]["A"]["frequency"] == 5
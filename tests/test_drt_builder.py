@@ -0,0 +1,388 @@
+"""
+Tests for the case metrics and tree construction of multi-dimensional DRTs.
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import mpvis
+from mpvis.mddrt import tree_builder
+from mpvis.mddrt.case_sequences import CaseSequences
+from mpvis.mddrt.compact_tree import CompactTree
+from mpvis.mddrt.drt_parameters import DirectlyRootedTreeParameters
+from mpvis.mddrt.pruning import prune_tree_to_depth
+from mpvis.mddrt.tree_grouper import DirectedRootedTreeGrouper
+from mpvis.mddrt.utils.builder import (
+    calculate_cases_metrics,
+    calculate_mandatory_and_optional_activities,
+)
+from mpvis.mddrt.utils.traversal import breadth_first, postorder, preorder
+
+
+def build_event_log():
+    cases = {
+        "C1": ["A", "B", "B", "D"],
+        "C2": ["A", "C", "D"],
+        "C3": ["A", "B", "C", "B", "D"],
+    }
+    rows = []
+    for case_id, activities in cases.items():
+        current_time = pd.Timestamp("2024-01-01 08:00:00")
+        for position, activity in enumerate(activities):
+            rows.append(
+                {
+                    "case_id": case_id,
+                    "activity": activity,
+                    "start_time": current_time + pd.Timedelta(minutes=5),
+                    "end_time": current_time + pd.Timedelta(minutes=5 + 10 * (position + 1)),
+                    "cost": 10 * (position + 1),
+                }
+            )
+            current_time = rows[-1]["end_time"]
+
+    event_log_format = {
+        "case:concept:name": "case_id",
+        "concept:name": "activity",
+        "time:timestamp": "end_time",
+        "start_timestamp": "start_time",
+        "org:resource": "",
+        "cost:total": "cost",
+    }
+    return mpvis.log_formatter(pd.DataFrame(rows), event_log_format)
+
+
+def test_cases_metrics_are_indexed_by_case_id():
+    cases_metrics = calculate_cases_metrics(build_event_log(), DirectlyRootedTreeParameters())
+
+    assert list(cases_metrics.index) == ["C1", "C2", "C3"]
+    assert cases_metrics.loc["C1", "Duration"] == pd.Timedelta(minutes=115)
+    assert cases_metrics["Cost"].tolist() == [100, 60, 150]
+    assert cases_metrics["Rework"].tolist() == [1, 0, 1]
+    assert cases_metrics["Optionality"].tolist() == [1, 1, 2]
+    assert cases_metrics["Total Activities"].tolist() == [4, 3, 5]
+    assert calculate_mandatory_and_optional_activities(
+        build_event_log(), DirectlyRootedTreeParameters()
+    ) == (frozenset({"A", "D"}), frozenset({"B", "C"}))
+
+
+def test_case_sequences_store_sorted_events_by_offsets():
+    log = build_event_log().sample(frac=1, random_state=7)
+    params = DirectlyRootedTreeParameters()
+    cases_metrics = calculate_cases_metrics(log, params)
+    cases = CaseSequences(log, params, cases_metrics, frozenset({"B", "C"}))
+
+    assert len(cases) == 3
+    assert cases.case_ids.tolist() == log["case:concept:name"].unique().tolist()
+    assert cases.offsets[-1] == len(log)
+
+    sequences = {case_id: cases[index] for index, case_id in enumerate(cases.case_ids)}
+    assert sequences["C1"].activities == ["A", "B", "B", "D"]
+    assert sequences["C3"].activities == ["A", "B", "C", "B", "D"]
+    assert sequences["C2"].service_times == [600_000_000, 1_200_000_000, 1_800_000_000]
+    assert sequences["C2"].waiting_times == [0, 300_000_000, 300_000_000]
+    assert sequences["C2"].costs == [10, 20, 30]
+    assert sequences["C2"].metrics["time"] == 70 * 60 * 1_000_000
+    assert sequences["C3"].metrics["quality"] == 1
+
+    assert sequences["C2"].accumulated["cost"] == [10, 30, 60]
+    assert sequences["C2"].accumulated["time"][-1] == sequences["C2"].metrics["time"]
+    assert sequences["C3"].is_rework == [False, False, False, True, False]
+    assert sequences["C3"].accumulated["quality"] == [0, 0, 0, 1, 1]
+    assert sequences["C3"].accumulated["flexibility"] == [0, 1, 2, 2, 2]
+
+
+def assert_children_index_is_consistent(node):
+    expected_index = {}
+    for child in node.children:
+        expected_index.setdefault((child.name, child.is_path_end), child)
+        assert child.parent is node
+        assert_children_index_is_consistent(child)
+    assert node.children_index == expected_index
+
+
+def test_children_index_is_kept_through_grouping_and_pruning():
+    drt = mpvis.mddrt.discover_multi_dimensional_drt(build_event_log())
+    assert_children_index_is_consistent(drt)
+
+    first_activity = drt.get_child_by_name_depth_and_end_status(
+        name="A", depth=0, is_path_end=False
+    )
+    assert [child.name for child in first_activity.children] == ["C", "B"]
+    assert (
+        first_activity.get_child_by_name_depth_and_end_status(name="B", depth=1, is_path_end=False)
+        is first_activity.children[1]
+    )
+
+    grouped_drt = mpvis.mddrt.discover_multi_dimensional_drt(
+        build_event_log(), group_activities=True
+    )
+    assert_children_index_is_consistent(grouped_drt)
+    grouped_first_activity = grouped_drt.children[0]
+    assert grouped_first_activity.children[0].name.startswith("2 activities")
+    assert grouped_first_activity.children[0].children == []
+
+    pruned_drt = prune_tree_to_depth(drt, 2)
+    assert_children_index_is_consistent(pruned_drt)
+    assert all(child.children == [] for child in pruned_drt.children[0].children)
+
+
+def dump_tree(node):
+    children = tuple(dump_tree(child) for child in node.children)
+    return (node.name, node.depth, node.is_path_end, node.frequency, node.dimensions_data, children)
+
+
+def test_variant_aggregation_builds_the_same_tree():
+    event_log = build_event_log()
+    repeated_case = event_log[event_log["case:concept:name"] == "C1"].copy()
+    repeated_case["case:concept:name"] = "C4"
+    repeated_case["cost:total"] += 5
+    repeated_case["time:timestamp"] += pd.Timedelta(minutes=3)
+    event_log = pd.concat([event_log, repeated_case], ignore_index=True)
+
+    drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log)
+    aggregated_drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log, aggregate_variants=True)
+
+    assert dump_tree(aggregated_drt) == dump_tree(drt)
+    assert aggregated_drt.children[0].frequency == 4
+
+
+def test_compact_tree_views_match_the_tree():
+    drt = mpvis.mddrt.discover_multi_dimensional_drt(build_event_log())
+    compact_drt = CompactTree.from_tree(drt)
+
+    assert len(compact_drt) == 10
+    assert compact_drt.parents.tolist()[:3] == [-1, 0, 1]
+    assert (
+        compact_drt.metrics["time"]["lead_case"][0]
+        == drt.dimensions_data["time"]["lead_case"].total_seconds()
+    )
+    assert dump_tree(compact_drt.root) == dump_tree(drt)
+    assert dump_tree(compact_drt.to_tree()) == dump_tree(drt)
+    assert compact_drt.root.children[0].children[1].parent == compact_drt.node(1)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_compact_discovery_matches_the_tree_built_block_by_block(monkeypatch, n_jobs):
+    """
+    Test that building the compact tree from blocks of cases gives the same tree as converting
+    the tree built at once, and that grouping it gives the same grouped tree.
+    """
+    monkeypatch.setattr(tree_builder, "COMPACT_TREE_BLOCK_SIZE", 2)
+    event_log = build_event_log()
+    drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log)
+
+    compact_drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log, compact=True, n_jobs=n_jobs)
+    assert isinstance(compact_drt, mpvis.mddrt.CompactTree)
+    assert dump_tree(compact_drt.root) == dump_tree(drt)
+    assert compact_drt.parents.tolist() == CompactTree.from_tree(drt).parents.tolist()
+
+    grouped_compact_drt = mpvis.mddrt.discover_multi_dimensional_drt(
+        event_log, group_activities=True, compact=True, n_jobs=n_jobs
+    )
+    grouped_drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log, group_activities=True)
+    assert dump_tree(grouped_compact_drt.root) == dump_tree(grouped_drt)
+
+
+def test_compact_tree_views_look_up_children_and_keep_their_dimensions_data():
+    compact_drt = mpvis.mddrt.discover_multi_dimensional_drt(build_event_log(), compact=True)
+    first_activity = compact_drt.root.children[0]
+
+    assert (
+        first_activity.get_child_by_name_depth_and_end_status(name="B", depth=1, is_path_end=False)
+        == first_activity.children[1]
+    )
+    assert (
+        first_activity.get_child_by_name_depth_and_end_status(name="B", depth=2, is_path_end=False)
+        is None
+    )
+    assert (
+        first_activity.get_child_by_name_depth_and_end_status(name="D", depth=1, is_path_end=True)
+        is None
+    )
+
+    node = first_activity.children[1]
+    assert node.dimensions_data is node.dimensions_data
+    assert compact_drt.metric(node.index, "time", "lead") == node.dimensions_data["time"]["lead"]
+    assert compact_drt.metric(node.index, "quality", "is_rework") == "No"
+
+
+def test_compact_tree_grouping_and_pruning_match_the_tree():
+    event_log = build_event_log()
+    drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log)
+    compact_drt = CompactTree.from_tree(drt)
+
+    for show_names in [False, True]:
+        grouped_drt = mpvis.mddrt.discover_multi_dimensional_drt(
+            event_log, group_activities=True, show_names=show_names
+        )
+        grouped_compact_drt = DirectedRootedTreeGrouper(compact_drt, show_names).get_tree()
+        assert dump_tree(grouped_compact_drt.root) == dump_tree(grouped_drt)
+
+    for max_depth in range(4):
+        pruned_compact_drt = prune_tree_to_depth(compact_drt, max_depth)
+        assert dump_tree(pruned_compact_drt.root) == dump_tree(prune_tree_to_depth(drt, max_depth))
+
+
+def test_compact_tree_diagram_only_differs_in_node_ids():
+    drt = mpvis.mddrt.discover_multi_dimensional_drt(build_event_log())
+    diagram = mpvis.mddrt.get_multi_dimensional_drt_string(drt, arc_measures=["avg", "max"])
+    compact_diagram = mpvis.mddrt.get_multi_dimensional_drt_string(
+        CompactTree.from_tree(drt), arc_measures=["avg", "max"]
+    )
+
+    ids = {str(node.id): str(index) for index, node in enumerate(breadth_first_nodes(drt))}
+    for tree_id, compact_id in ids.items():
+        diagram = diagram.replace(f"\t{tree_id} ", f"\tnode{compact_id} ")
+        diagram = diagram.replace(f"-> {tree_id} ", f"-> node{compact_id} ")
+        compact_diagram = compact_diagram.replace(f"\t{compact_id} ", f"\tnode{compact_id} ")
+        compact_diagram = compact_diagram.replace(f"-> {compact_id} ", f"-> node{compact_id} ")
+    assert compact_diagram == diagram
+
+
+def breadth_first_nodes(root):
+    nodes = [root]
+    for node in nodes:
+        nodes.extend(node.children)
+    return nodes
+
+
+def test_parallel_build_matches_sequential_build():
+    event_log = build_event_log()
+    drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log)
+    parallel_drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log, n_jobs=2)
+
+    assert dump_tree(parallel_drt) == dump_tree(drt)
+    assert parallel_drt.children[0].children[1].id - parallel_drt.id == (
+        drt.children[0].children[1].id - drt.id
+    )
+
+    with pytest.raises(ValueError, match="Number of jobs"):
+        mpvis.mddrt.discover_multi_dimensional_drt(event_log, n_jobs=0)
+
+
+def test_concurrent_builds_use_their_own_optional_activities():
+    event_log = build_event_log()
+    single_variant_log = event_log[event_log["case:concept:name"] == "C2"]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        builds = [
+            executor.submit(mpvis.mddrt.discover_multi_dimensional_drt, log)
+            for log in [event_log, single_variant_log] * 4
+        ]
+        drts = [build.result() for build in builds]
+
+    for drt in drts[::2]:
+        assert drt.children[0].children[0].dimensions_data["flexibility"]["is_optional"] == "Yes"
+    for drt in drts[1::2]:
+        assert drt.children[0].children[0].dimensions_data["flexibility"]["is_optional"] == "No"
+
+
+def test_traversals_visit_nodes_in_order():
+    drt = mpvis.mddrt.discover_multi_dimensional_drt(build_event_log())
+    names = lambda nodes: [f"{node.name}{node.depth}" for node in nodes]  # noqa: E731
+
+    assert names(preorder(drt)) == [
+        "root-1", "A0", "C1", "D2", "B1", "B2", "D3", "C2", "B3", "D4",
+    ]  # fmt: skip
+    assert names(postorder(drt)) == [
+        "D2", "C1", "D3", "B2", "D4", "B3", "C2", "B1", "A0", "root-1",
+    ]  # fmt: skip
+    assert names(breadth_first(drt)) == [
+        "root-1", "A0", "C1", "B1", "D2", "B2", "C2", "D3", "B3", "D4",
+    ]  # fmt: skip
+
+
+def test_deep_trees_do_not_need_a_higher_recursion_limit():
+    depth = 3 * sys.getrecursionlimit()
+    start = pd.Timestamp("2024-01-01")
+    rows = [
+        {
+            "case:concept:name": case_id,
+            "concept:name": f"Step {position % 7}",
+            "start_timestamp": start + pd.Timedelta(minutes=position),
+            "time:timestamp": start + pd.Timedelta(minutes=position + 1),
+            "cost:total": 1,
+        }
+        for case_id, length in [("Long", depth), ("Short", 3)]
+        for position in range(length)
+    ]
+    event_log = pd.DataFrame(rows)
+
+    drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log)
+    grouped_drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log, group_activities=True)
+    pruned_drt = prune_tree_to_depth(drt, depth)
+
+    assert sum(1 for _ in preorder(drt)) == depth + 2
+    assert sum(1 for _ in preorder(pruned_drt)) == depth + 2
+    assert grouped_drt.children[0].name.startswith("2 activities")
+    assert grouped_drt.children[0].children[0].name.startswith(f"{depth - 2} activities")
+    assert mpvis.mddrt.get_multi_dimensional_drt_string(grouped_drt)
+
+
+def test_pruned_tree_view_matches_pruned_copy_without_copying():
+    drt = mpvis.mddrt.discover_multi_dimensional_drt(build_event_log())
+    full_tree = dump_tree(drt)
+
+    for max_depth in range(5):
+        pruned_view = mpvis.mddrt.pruned_tree_view(drt, max_depth)
+        assert dump_tree(pruned_view) == dump_tree(prune_tree_to_depth(drt, max_depth))
+        assert [node.id for node in preorder(pruned_view)] == [
+            node.id for node in preorder(drt) if node.depth < max_depth
+        ]
+        assert mpvis.mddrt.get_multi_dimensional_drt_string(pruned_view)
+
+    assert dump_tree(drt) == full_tree
+    nested_view = mpvis.mddrt.pruned_tree_view(mpvis.mddrt.pruned_tree_view(drt, 1), 3)
+    assert dump_tree(nested_view) == dump_tree(prune_tree_to_depth(drt, 3))
+    assert nested_view.children[0].parent.node is drt
+
+
+def test_grouping_collapses_every_chain_of_a_wide_tree():
+    start = pd.Timestamp("2024-01-01")
+    rows = [
+        {
+            "case:concept:name": f"Case {case_number}",
+            "concept:name": activity,
+            "start_timestamp": start + pd.Timedelta(minutes=position),
+            "time:timestamp": start + pd.Timedelta(minutes=position + 1),
+            "cost:total": position + 1,
+        }
+        for case_number in range(500)
+        for position, activity in enumerate([f"Start {case_number}", "Middle", "End"])
+    ]
+    event_log = pd.DataFrame(rows)
+
+    for calculate_quality in [True, False]:
+        grouped_drt = mpvis.mddrt.discover_multi_dimensional_drt(
+            event_log, calculate_quality=calculate_quality, group_activities=True
+        )
+
+        assert len(grouped_drt.children) == 500
+        for grouped_node in grouped_drt.children:
+            assert grouped_node.name.startswith("3 activities")
+            assert grouped_node.parent is grouped_drt
+            assert grouped_node.children == []
+            assert grouped_node.dimensions_data["cost"]["total"] == 6
+            assert grouped_node.dimensions_data["cost"]["accumulated"] == 6
+            assert grouped_node.dimensions_data["cost"]["min"] == 1
+            assert grouped_node.dimensions_data["cost"]["max"] == 3
+            assert grouped_node.dimensions_data["time"]["lead"] == pd.Timedelta(minutes=3)
+            assert (
+                grouped_node.dimensions_data["flexibility"]["is_optional"]
+                == "1 optional activities in group"
+            )
+
+
+def test_compact_tree_grouping_of_a_single_chain_matches_the_tree():
+    event_log = build_event_log()
+    event_log = event_log[event_log["case:concept:name"] == "C2"]
+
+    grouped_drt = mpvis.mddrt.discover_multi_dimensional_drt(event_log, group_activities=True)
+    compact_drt = CompactTree.from_tree(mpvis.mddrt.discover_multi_dimensional_drt(event_log))
+    grouped_compact_drt = DirectedRootedTreeGrouper(compact_drt).get_tree()
+
+    assert grouped_drt.children[0].name.startswith("3 activities")
+    assert dump_tree(grouped_compact_drt.root) == dump_tree(grouped_drt)
@@ -0,0 +1,169 @@
+"""
+Tests for the event log preprocessing functions.
+"""
+
+import pandas as pd
+import pytest
+
+from mpvis import preprocessing
+
+
+def build_event_log(cases: dict[str, list[str]]) -> pd.DataFrame:
+    rows = []
+    for case_id, activities in cases.items():
+        current_time = pd.Timestamp("2024-01-01 08:00:00")
+        for position, activity in enumerate(activities):
+            rows.append(
+                {
+                    "case:concept:name": case_id,
+                    "concept:name": activity,
+                    "start_timestamp": current_time,
+                    "time:timestamp": current_time + pd.Timedelta(minutes=10),
+                    "cost:total": position + 1,
+                    "org:resource": f"R{position + 1}",
+                    "waiting": pd.Timedelta(minutes=position),
+                    "priority": "High" if position % 2 else "Low",
+                }
+            )
+            current_time += pd.Timedelta(minutes=15)
+    return pd.DataFrame(rows).astype({"priority": "category"})
+
+
+def test_manual_log_grouping_merges_every_group_instance():
+    event_log = build_event_log(
+        {
+            "C1": ["A", "B", "X", "C", "B"],
+            "C2": ["X", "B", "B", "A", "A"],
+            "C3": ["A", "X"],
+        }
+    )
+    # C3 is moved after C2 to check that the events of a case are grouped together.
+    event_log = pd.concat([event_log.iloc[:6], event_log.iloc[10:], event_log.iloc[6:10]])
+
+    grouped_log = preprocessing.manual_log_grouping(event_log, ["A", "B", "C"], group_name="G")
+
+    assert grouped_log["case:concept:name"].tolist() == ["C1"] * 3 + ["C2"] * 4 + ["C3"] * 2
+    assert grouped_log["concept:name"].tolist() == ["G", "X", "B", "X", "G", "B", "A", "A", "X"]
+
+    first_group = grouped_log.iloc[0]
+    assert first_group["start_timestamp"] == pd.Timestamp("2024-01-01 08:00:00")
+    assert first_group["time:timestamp"] == pd.Timestamp("2024-01-01 08:55:00")
+    assert first_group["cost:total"] == 1 + 2 + 4
+    assert first_group["org:resource"] == "[R1,R2,R4]"
+    assert first_group["waiting"] == pd.Timedelta(minutes=0 + 1 + 3)
+    # Categorical columns are merged as their categories, like in the string columns.
+    assert first_group["priority"] == "[Low,High,High]"
+
+    # Repeated activities of an open group instance and incomplete instances of a single event
+    # are kept as they are.
+    assert grouped_log.iloc[2]["cost:total"] == 5
+    assert grouped_log.iloc[4]["org:resource"] == "[R2,R4]"
+    assert grouped_log.iloc[5]["cost:total"] == 3
+    assert grouped_log.iloc[6]["cost:total"] == 5
+    assert grouped_log.iloc[7]["org:resource"] == "R1"
+
+
+def test_manual_log_grouping_validates_activities_to_group():
+    event_log = build_event_log({"C1": ["A", "B"]})
+
+    with pytest.raises(ValueError, match="not in log activity names"):
+        preprocessing.manual_log_grouping(event_log, ["A", "Z"])
+    with pytest.raises(ValueError, match="duplicated elements"):
+        preprocessing.manual_log_grouping(event_log, ["A", "A"])
+
+
+def test_batch_manual_log_grouping_matches_grouping_one_after_another():
+    event_log = build_event_log(
+        {
+            "C1": ["A", "B", "X", "C", "D", "B", "A"],
+            "C2": ["D", "X", "C", "A", "B", "C"],
+        }
+    )
+
+    grouped_log = preprocessing.batch_manual_log_grouping(
+        event_log, [(["A", "B"], "AB"), (["C", "D"], None)]
+    )
+
+    expected_log = preprocessing.manual_log_grouping(event_log, ["A", "B"], group_name="AB")
+    expected_log = preprocessing.manual_log_grouping(expected_log, ["C", "D"])
+    pd.testing.assert_frame_equal(grouped_log, expected_log)
+    assert "[C,<br/>D]" in grouped_log["concept:name"].tolist()
+
+
+def test_batch_manual_log_grouping_gives_shared_activities_to_the_first_grouping():
+    event_log = build_event_log({"C1": ["A", "B", "C"]})
+
+    grouped_log = preprocessing.batch_manual_log_grouping(
+        event_log, [(["A", "B"], "AB"), (["B", "C"], "BC")]
+    )
+
+    assert grouped_log["concept:name"].tolist() == ["AB", "C"]
+
+
+def test_variants_table_ranks_variants_by_frequency_and_sequence():
+    event_log = build_event_log(
+        {
+            "C1": ["A", "B"],
+            "C2": ["A", "C"],
+            "C3": ["A", "B"],
+            "C4": ["A", "C"],
+            "C5": ["B"],
+            "C6": ["A", "B"],
+        }
+    )
+    # Events are ordered by timestamp inside each case, whatever their order in the log.
+    event_log = event_log.iloc[::-1]
+
+    variants_table = preprocessing.get_variants_table(event_log)
+
+    assert variants_table["variant_id"].tolist() == [0, 1, 2]
+    assert variants_table["sequence"].tolist() == [("A", "B"), ("A", "C"), ("B",)]
+    assert variants_table["frequency"].tolist() == [3, 2, 1]
+    assert variants_table["coverage"].tolist() == pytest.approx([3 / 6, 5 / 6, 1])
+    assert [sorted(case_ids) for case_ids in variants_table["case_ids"]] == [
+        ["C1", "C3", "C6"],
+        ["C2", "C4"],
+        ["C5"],
+    ]
+
+
+def test_prune_log_based_on_top_variants_keeps_the_events_of_the_top_variants():
+    event_log = build_event_log(
+        {"C1": ["A", "B"], "C2": ["B", "A"], "C3": ["A", "B"], "C4": ["C"], "C5": ["B"]}
+    )
+
+    pruned_log = preprocessing.prune_log_based_on_top_variants(event_log, 2)
+
+    # Ties between variants of the same frequency are broken by the highest sequence.
+    assert pruned_log["case:concept:name"].tolist() == ["C1", "C1", "C3", "C3", "C4"]
+    pd.testing.assert_frame_equal(pruned_log, event_log.loc[pruned_log.index])
+    assert preprocessing.prune_log_based_on_top_variants(event_log, 0).empty
+
+
+@pytest.mark.parametrize(
+    ("coverage", "expected_cases"),
+    [(0, []), (0.5, ["C1", "C3"]), (0.51, ["C1", "C3", "C4"]), (1, ["C1", "C2", "C3", "C4"])],
+)
+def test_prune_log_based_on_variants_coverage_keeps_the_fewest_variants(coverage, expected_cases):
+    event_log = build_event_log({"C1": ["A", "B"], "C2": ["A", "C"], "C3": ["A", "B"], "C4": ["B"]})
+
+    pruned_log = preprocessing.prune_log_based_on_variants_coverage(event_log, coverage)
+
+    assert pruned_log["case:concept:name"].unique().tolist() == expected_cases
+
+
+def test_prune_log_based_on_variants_coverage_validates_the_coverage():
+    event_log = build_event_log({"C1": ["A"]})
+
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        preprocessing.prune_log_based_on_variants_coverage(event_log, 80)
+
+
+def test_prune_log_based_on_variants_frequency_keeps_frequent_variants():
+    event_log = build_event_log(
+        {"C1": ["A", "B"], "C2": ["A", "C"], "C3": ["A", "B"], "C4": ["B"], "C5": ["B"]}
+    )
+
+    pruned_log = preprocessing.prune_log_based_on_variants_frequency(event_log, 2)
+
+    assert pruned_log["case:concept:name"].unique().tolist() == ["C1", "C3", "C4", "C5"]